@@ -0,0 +1,355 @@
+"""Bulk synthetic data for scale testing: users, auctions, bids, orders, notifications.
+
+Volumes are configurable up to millions of rows, with realistic skew: bids
+follow a power law over auctions (a few hot auctions get most of them) and
+over users (power bidders), and sellers are skewed the same way. Rows are
+generated and loaded in parallel worker processes, through Postgres ``COPY``
+or, on other databases, batched ``executemany`` inserts.
+
+Every chunk draws from its own RNG seeded by ``(seed, table, chunk)``, so the
+same ``--seed`` and ``--now`` produce the same rows whatever ``--workers`` is.
+
+    python bench/datagen.py --users 1000000 --auctions 500000 --bids 20000000 \\
+        --orders 100000 --notifications 5000000 --workers 8
+    python bench/datagen.py --database-url sqlite:///bench.db --create-schema
+
+All generated users share the password ``password``. Rows are appended after
+the current max ids, and ``stat_counters`` is cleared so the admin stats get
+recounted on their next refresh.
+"""
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Auction, Bid, Order, Notification, ORDER_STATUSES
+
+CATEGORIES = ['Watches', 'Collectibles', 'Art', 'Electronics', 'Books', 'Jewelry', 'Fashion', 'Sports', 'Toys', 'Home']
+ADJECTIVES = ['Vintage', 'Rare', 'Antique', 'Signed', 'Limited', 'Classic', 'Mint', 'Handmade', 'Restored', 'Original']
+NOUNS = ['Watch', 'Card Set', 'Painting', 'Camera', 'First Edition', 'Necklace', 'Jacket', 'Jersey', 'Figure', 'Lamp']
+GENERATED_PASSWORD = 'password'
+
+_TABLES = {
+    'users': (User.__table__, ['id', 'name', 'email', 'password', 'created_at', 'email_verified', 'is_admin']),
+    'auctions': (Auction.__table__, ['id', 'title', 'description', 'starting_price', 'current_price', 'end_time',
+                                     'seller_id', 'category', 'image_url', 'created_at', 'history_link']),
+    'bids': (Bid.__table__, ['id', 'auction_id', 'user_id', 'amount', 'bid_time']),
+    'orders': (Order.__table__, ['id', 'auction_id', 'user_id', 'address', 'payment_status', 'order_status', 'created_at']),
+    'notifications': (Notification.__table__, ['id', 'user_id', 'message', 'is_read', 'created_at', 'link']),
+}
+
+
+def database_url(url=None):
+    url = url or os.getenv('DATABASE_URL')
+    if not url:
+        sys.exit('Set DATABASE_URL or pass --database-url.')
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def power_law_index(rng, n, skew):
+    """Index in [0, n) with P(k) roughly proportional to 1 / (k + 1) ** skew."""
+    u = rng.random()
+    if abs(skew - 1.0) < 1e-9:
+        x = n ** u
+    else:
+        x = ((n ** (1 - skew) - 1) * u + 1) ** (1 / (1 - skew))
+    return min(n - 1, int(x) - 1)
+
+
+def scatter(index, n):
+    """Spread power-law ranks over the id space so the hottest rows aren't all id 1, 2, 3..."""
+    return (index * 2654435761) % n if math.gcd(2654435761, n) == 1 else index
+
+
+def chunk_rng(seed, table, chunk):
+    return random.Random(f'{seed}:{table}:{chunk}')
+
+
+# --- Row generators (one chunk each) ---
+
+def generate_users(plan, chunk, start, stop):
+    rng = chunk_rng(plan['seed'], 'users', chunk)
+    now = plan['now']
+    for i in range(start, stop):
+        user_id = plan['user_base'] + i
+        yield (user_id, f'User {user_id}', f'user{user_id}@example.com', plan['password_hash'],
+               now - timedelta(days=rng.uniform(0, 730)), rng.random() < 0.8, False)
+
+
+def generate_auctions(plan, chunk, start, stop, bid_counts, bid_id):
+    """Auctions [start, stop) with their bids and, for some ended ones, the winner's order."""
+    rng = chunk_rng(plan['seed'], 'auctions', chunk)
+    now, n_users = plan['now'], plan['users_total']
+    auctions, bids, orders = [], [], []
+    for offset, i in enumerate(range(start, stop)):
+        auction_id = plan['auction_base'] + i
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        ended = rng.random() < plan['ended_fraction']
+        end_time = (now - timedelta(hours=rng.uniform(1, 24 * 60))) if ended else (now + timedelta(hours=rng.uniform(1, 24 * 14)))
+        end_time = max(end_time, created_at + timedelta(hours=1))
+        seller_id = plan['user_first'] + scatter(power_law_index(rng, n_users, plan['seller_skew']), n_users)
+        starting_price = round(rng.uniform(5, 5000), 2)
+        price = starting_price
+        bid_window = (min(end_time, now) - created_at).total_seconds()
+        # Spread the climb over the bid count so hot auctions end at a sane multiple of the start price.
+        step = starting_price * rng.uniform(0.2, 4.0) / max(bid_counts[offset], 1)
+        bidder_id = None
+        for k in range(bid_counts[offset]):
+            price = round(price + step * rng.uniform(0.5, 1.5) + 0.01, 2)
+            bidder_id = plan['user_first'] + scatter(power_law_index(rng, n_users, plan['bidder_skew']), n_users)
+            if bidder_id == seller_id:
+                bidder_id = plan['user_first'] + (bidder_id - plan['user_first'] + 1) % n_users
+            bid_time = created_at + timedelta(seconds=bid_window * (k + rng.random()) / bid_counts[offset])
+            bids.append((bid_id, auction_id, bidder_id, price, bid_time))
+            bid_id += 1
+        category = CATEGORIES[power_law_index(rng, len(CATEGORIES), 0.8)]
+        title = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} #{auction_id}'
+        auctions.append((auction_id, title, f'Generated {category.lower()} listing.', starting_price, price,
+                         end_time, seller_id, category, None, created_at, None))
+        if ended and bidder_id is not None and rng.random() < plan['order_probability']:
+            # One order per auction at most, so the auction id doubles as a collision-free order id.
+            orders.append((plan['order_base'] + i, auction_id, bidder_id, f'{rng.randint(1, 999)} Generated Street',
+                           'paid', rng.choice(ORDER_STATUSES), end_time + timedelta(hours=rng.uniform(1, 72))))
+    return auctions, bids, orders
+
+
+def generate_notifications(plan, chunk, start, stop):
+    rng = chunk_rng(plan['seed'], 'notifications', chunk)
+    now, n_users, n_auctions = plan['now'], plan['users_total'], plan['auctions_total']
+    for i in range(start, stop):
+        user_id = plan['user_first'] + scatter(power_law_index(rng, n_users, plan['bidder_skew']), n_users)
+        auction_id = plan['auction_first'] + scatter(power_law_index(rng, n_auctions, plan['hot_skew']), n_auctions)
+        created_at = now - timedelta(days=rng.uniform(0, 90))
+        yield (plan['notification_base'] + i, user_id, f'You have been outbid on auction #{auction_id}.',
+               created_at < now - timedelta(days=2) or rng.random() < 0.5, created_at, f'/auction/{auction_id}')
+
+
+# --- Loaders ---
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return value
+
+
+def copy_rows(raw_conn, table, rows, batch_size):
+    """Stream rows into Postgres with COPY ... FROM STDIN, one buffer per batch."""
+    columns = _TABLES[table][1]
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = raw_conn.cursor()
+    buffer, pending = io.StringIO(), 0
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        pending += 1
+        if pending >= batch_size:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+
+
+def insert_rows(conn, table, rows, batch_size):
+    """Portable fallback: executemany INSERTs in batches."""
+    table_obj, columns = _TABLES[table]
+    batch = []
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        if len(batch) >= batch_size:
+            conn.execute(table_obj.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table_obj.insert(), batch)
+
+
+def _load(plan, tables_and_rows):
+    engine = create_engine(plan['url'], poolclass=NullPool)
+    try:
+        if plan['method'] == 'copy':
+            raw = engine.raw_connection()
+            try:
+                for table, rows in tables_and_rows:
+                    copy_rows(raw, table, rows, plan['batch_size'])
+                raw.commit()
+            finally:
+                raw.close()
+        else:
+            with engine.begin() as conn:
+                for table, rows in tables_and_rows:
+                    insert_rows(conn, table, rows, plan['batch_size'])
+    finally:
+        engine.dispose()
+
+
+def load_chunk(task):
+    """Worker entry point: generate one chunk and load it in a single transaction."""
+    plan, kind, chunk, start, stop, extra = task
+    if kind == 'users':
+        _load(plan, [('users', generate_users(plan, chunk, start, stop))])
+    elif kind == 'auctions':
+        auctions, bids, orders = generate_auctions(plan, chunk, start, stop, *extra)
+        _load(plan, [('auctions', auctions), ('bids', bids), ('orders', orders)])
+    else:
+        _load(plan, [('notifications', generate_notifications(plan, chunk, start, stop))])
+    return kind, stop - start
+
+
+# --- Planning ---
+
+def plan_bid_counts(seed, auctions, bids, skew):
+    """Bids per auction following a power law over (scattered) auction ranks, summing to ``bids``."""
+    if not auctions:
+        return []
+    weights = [1 / (rank + 1) ** skew for rank in range(auctions)]
+    total = sum(weights)
+    counts = [0] * auctions
+    for rank, weight in enumerate(weights):
+        counts[scatter(rank, auctions)] = int(bids * weight / total)
+    rng = random.Random(f'{seed}:bid-remainder')
+    for _ in range(bids - sum(counts)):
+        counts[rng.randrange(auctions)] += 1
+    return counts
+
+
+def next_ids(engine):
+    with engine.connect() as conn:
+        return {table: conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar() + 1
+                for table in _TABLES}
+
+
+def build_tasks(args, plan):
+    chunk = args.chunk_size
+    users = [(plan, 'users', n, start, min(start + chunk, args.users), None)
+             for n, start in enumerate(range(0, args.users, chunk))]
+
+    counts = plan_bid_counts(args.seed, args.auctions, args.bids, args.hot_skew)
+    auctions, bid_id = [], plan['bid_base']
+    for n, start in enumerate(range(0, args.auctions, chunk)):
+        stop = min(start + chunk, args.auctions)
+        auctions.append((plan, 'auctions', n, start, stop, (counts[start:stop], bid_id)))
+        bid_id += sum(counts[start:stop])
+
+    notifications = [(plan, 'notifications', n, start, min(start + chunk, args.notifications), None)
+                     for n, start in enumerate(range(0, args.notifications, chunk))]
+    return [users, auctions, notifications]
+
+
+def finish(engine, url):
+    """Move sequences past the explicit ids, drop stale counters and refresh planner stats."""
+    with engine.begin() as conn:
+        if url.startswith('postgresql'):
+            for table in _TABLES:
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                  f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"))
+        conn.execute(text("DELETE FROM stat_counters"))
+    if url.startswith('postgresql'):
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and bulk-load synthetic AuctionHub data.')
+    parser.add_argument('--database-url', help='defaults to DATABASE_URL')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--auctions', type=int, default=5000)
+    parser.add_argument('--bids', type=int, default=200000)
+    parser.add_argument('--orders', type=int, default=1000, help='approximate; placed on ended auctions with bids')
+    parser.add_argument('--notifications', type=int, default=50000)
+    parser.add_argument('--ended-fraction', type=float, default=0.3, help='share of auctions that already ended')
+    parser.add_argument('--hot-skew', type=float, default=1.1, help='power-law exponent of bids over auctions')
+    parser.add_argument('--bidder-skew', type=float, default=1.0, help='power-law exponent of bids over users')
+    parser.add_argument('--seller-skew', type=float, default=0.8, help='power-law exponent of auctions over sellers')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--now', type=datetime.fromisoformat, default=None,
+                        help='anchor for generated timestamps (ISO format); pin it for byte-identical reruns')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=20000, help='rows per worker task (fixes the RNG streams)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per COPY buffer / executemany call')
+    parser.add_argument('--method', choices=['auto', 'copy', 'executemany'], default='auto')
+    parser.add_argument('--create-schema', action='store_true', help='create missing tables from models.py first')
+    args = parser.parse_args()
+
+    url = database_url(args.database_url)
+    engine = create_engine(url, poolclass=NullPool)
+    if args.create_schema:
+        db.metadata.create_all(engine)
+
+    method = args.method
+    if method == 'auto':
+        method = 'copy' if url.startswith('postgresql') else 'executemany'
+    workers = args.workers
+    if url.startswith('sqlite') and workers > 1:
+        print('SQLite allows a single writer; using 1 worker.', file=sys.stderr)
+        workers = 1
+
+    ids = next_ids(engine)
+    with engine.connect() as conn:
+        first_user, last_user, existing_users = conn.execute(text("SELECT MIN(id), MAX(id), COUNT(*) FROM users")).one()
+    if args.users == 0 and existing_users == 0:
+        sys.exit('No users to attach auctions to; pass --users.')
+    if args.users == 0 and last_user - first_user + 1 != existing_users:
+        # Generated rows pick users by offset from the first id, which only works without gaps.
+        sys.exit(f'Existing user ids {first_user}..{last_user} have gaps ({existing_users} users); pass --users.')
+    expected_ended = args.auctions * args.ended_fraction
+    plan = {
+        'url': url,
+        'method': method,
+        'batch_size': args.batch_size,
+        'seed': args.seed,
+        'now': args.now or datetime.now().replace(microsecond=0),
+        'password_hash': generate_password_hash(GENERATED_PASSWORD),
+        'user_base': ids['users'],
+        # Activity is spread over the freshly generated users (or existing ones if none are added).
+        'user_first': ids['users'] if args.users else first_user,
+        'users_total': args.users or existing_users,
+        'auction_base': ids['auctions'],
+        'auction_first': ids['auctions'],
+        'auctions_total': max(args.auctions, 1),
+        'bid_base': ids['bids'],
+        'order_base': ids['orders'],
+        'notification_base': ids['notifications'],
+        'ended_fraction': args.ended_fraction,
+        'order_probability': min(1.0, args.orders / expected_ended) if expected_ended else 0.0,
+        'hot_skew': args.hot_skew,
+        'bidder_skew': args.bidder_skew,
+        'seller_skew': args.seller_skew,
+    }
+    if not args.auctions and args.notifications:
+        sys.exit('Notifications link to generated auctions; pass --auctions too.')
+
+    started = time.monotonic()
+    with Pool(workers) as pool:
+        # Phases run in FK order; chunks inside a phase load in parallel.
+        for phase in build_tasks(args, plan):
+            loaded = 0
+            for kind, rows in pool.imap_unordered(load_chunk, phase):
+                loaded += rows
+                print(f'\r{kind}: {loaded} rows', end='', file=sys.stderr, flush=True)
+            if phase:
+                print(file=sys.stderr)
+    finish(engine, url)
+    print(f'Loaded in {time.monotonic() - started:.1f}s using {workers} worker(s) via {method}.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Measure cold import + app construction time for each way the app is started.
+
+Every sample is a fresh interpreter, so nothing is cached in sys.modules.
+Reports the in-process time to build the app and the whole process wall time
+as JSON so runs can be diffed across commits.
+
+    python bench/import_time.py --runs 10 --out import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (code run in the child, extra environment)
+SCENARIOS = {
+    # gunicorn loading wsgi:application: full app with Socket.IO. The warm-up is off: it measures
+    # the database and page rendering, not import time.
+    'wsgi': ('import wsgi', {'WARMUP_ENABLED': '0'}),
+    # `flask db upgrade` and other CLI commands: migrations, no Socket.IO.
+    'cli': ('from app import create_app; create_app()', {'FLASK_RUN_FROM_CLI': 'true'}),
+    # seed.py and other scripts: neither.
+    'script': ('from app import create_app; create_app(realtime_enabled=False)', {}),
+}
+
+CHILD = '''
+import sys, time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+print(int('flask_socketio' in sys.modules), int('alembic' in sys.modules), len(sys.modules))
+'''
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample(code, env):
+    started = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', CHILD.format(code=code)],
+                                     cwd=ROOT, env=env, text=True, stderr=subprocess.DEVNULL)
+    wall = time.perf_counter() - started
+    seconds, modules = output.strip().splitlines()[-2:]
+    socketio_loaded, alembic_loaded, module_count = (int(x) for x in modules.split())
+    return float(seconds), wall, {'socketio': bool(socketio_loaded), 'alembic': bool(alembic_loaded),
+                                  'modules': module_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AuctionHub startup cost per entry point.')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='default: all')
+    parser.add_argument('--out', help='write the JSON report here as well as stdout')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='auction-import-')
+    base_env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(workdir, 'import.db'))
+    base_env.pop('FLASK_RUN_FROM_CLI', None)
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        code, extra = SCENARIOS[name]
+        env = dict(base_env, **extra)
+        sample(code, env)  # warm the OS file cache
+        app_times, walls = [], []
+        for _ in range(args.runs):
+            seconds, wall, loaded = sample(code, env)
+            app_times.append(seconds)
+            walls.append(wall)
+        results[name] = {
+            'create_app_median_ms': round(statistics.median(app_times) * 1000, 1),
+            'create_app_min_ms': round(min(app_times) * 1000, 1),
+            'process_median_ms': round(statistics.median(walls) * 1000, 1),
+            'loaded': loaded,
+        }
+
+    report = {'commit': git_commit(), 'started_at': datetime.now().isoformat(timespec='seconds'),
+              'python': sys.version.split()[0], 'runs': args.runs, 'scenarios': results}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
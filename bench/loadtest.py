@@ -0,0 +1,314 @@
+"""End-to-end load test: mixed browsing traffic plus a bidding storm on one hot auction.
+
+Starts bench/server.py against a temporary SQLite file (default) or the
+database given by --database-url, logs in a pool of virtual users and drives
+a weighted mix of requests for --duration seconds. Socket.IO watchers sit in
+the hot auction's room and time each bid from POST to ``bid_update`` delivery.
+With --abusers, scripted bidders also hammer the hot auction with no pause,
+to check that the bid rate limits keep latency low for everyone else.
+The report (throughput, p50/p95/p99, error rates) is JSON so runs can be
+diffed across commits.
+
+    python bench/loadtest.py --duration 30 --users 40 --out bench_output.json
+    python bench/loadtest.py --database-url postgresql://localhost/auction_bench
+
+Socket.IO watchers need the client extras: pip install "python-socketio[client]".
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import datetime
+
+try:
+    import socketio as socketio_client
+except ImportError:
+    socketio_client = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'bench', 'server.py')
+BENCH_PASSWORD = 'bench-password'
+
+# Relative weights of each virtual-user action.
+TRAFFIC_MIX = {'browse': 30, 'view_auction': 30, 'dashboard': 15, 'bid': 25}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize_ms(samples):
+    return {
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+        'p50_ms': round(percentile(samples, 50) * 1000, 2) if samples else None,
+        'p95_ms': round(percentile(samples, 95) * 1000, 2) if samples else None,
+        'p99_ms': round(percentile(samples, 99) * 1000, 2) if samples else None,
+    }
+
+
+class Recorder:
+    """Collects latencies and outcomes; recording only starts after the warm-up."""
+
+    def __init__(self):
+        self.active = False
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.rejected = Counter()
+        self.broadcast = []
+
+    def record(self, op, seconds, outcome):
+        if not self.active:
+            return
+        self.latencies[op].append(seconds)
+        if outcome == 'error':
+            self.errors[op] += 1
+        elif outcome == 'rejected':
+            self.rejected[op] += 1
+
+
+class BidClock:
+    """Hands out strictly increasing bid amounts and remembers when each was sent."""
+
+    def __init__(self, start):
+        self.amounts = itertools.count(start)
+        self.sent_at = {}
+
+    def next_amount(self):
+        amount = float(next(self.amounts))
+        self.sent_at[amount] = time.perf_counter()
+        return amount
+
+
+class VirtualUser:
+    def __init__(self, base_url, email, auction_ids, hot_auction, bid_clock, recorder):
+        self.base_url = base_url
+        self.email = email
+        self.auction_ids = auction_ids
+        self.hot_auction = hot_auction
+        self.bid_clock = bid_clock
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, payload=None):
+        data, headers = None, {}
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def timed(self, op, path, payload=None):
+        start = time.perf_counter()
+        try:
+            status, body = self.request(path, payload)
+        except Exception:
+            self.recorder.record(op, time.perf_counter() - start, 'error')
+            return None
+        elapsed = time.perf_counter() - start
+        outcome = 'error' if status >= 500 else 'ok'
+        if outcome == 'ok' and payload is not None:
+            try:
+                if not json.loads(body).get('success', True):
+                    outcome = 'rejected'
+            except ValueError:
+                outcome = 'error'
+        self.recorder.record(op, elapsed, outcome)
+        return body
+
+    def login(self):
+        status, body = self.request('/api/login', {'email': self.email, 'password': BENCH_PASSWORD})
+        if status != 200 or not json.loads(body).get('success'):
+            raise RuntimeError(f'login failed for {self.email}: {status} {body[:200]!r}')
+
+    def step(self, op):
+        if op == 'browse':
+            self.timed(op, '/')
+        elif op == 'view_auction':
+            self.timed(op, f'/auction/{random.choice(self.auction_ids)}')
+        elif op == 'dashboard':
+            self.timed(op, '/dashboard')
+            self.timed('dashboard_content', f'/api/dashboard_content?tab={random.choice(["my-bids", "my-auctions", "my-orders"])}')
+        elif op == 'bid':
+            self.timed(op, '/api/bid', {'auction_id': self.hot_auction, 'amount': self.bid_clock.next_amount()})
+
+    def abuse(self, deadline):
+        while time.monotonic() < deadline:
+            self.timed('abuse_bid', '/api/bid', {'auction_id': self.hot_auction, 'amount': self.bid_clock.next_amount()})
+
+    def run(self, deadline, think_time):
+        ops, weights = zip(*TRAFFIC_MIX.items())
+        while time.monotonic() < deadline:
+            self.step(random.choices(ops, weights)[0])
+            if think_time:
+                eventlet.sleep(random.uniform(0, think_time))
+
+
+def start_watchers(base_url, hot_auction, count, bid_clock, recorder):
+    """Socket.IO clients in the hot auction room that time bid_update delivery."""
+    if socketio_client is None:
+        print('python-socketio client not installed; skipping broadcast latency.', file=sys.stderr)
+        return []
+    watchers = []
+    for _ in range(count):
+        client = socketio_client.Client(reconnection=False)
+
+        @client.on('bid_update')
+        def on_bid_update(data):
+            sent = bid_clock.sent_at.get(float(data.get('new_price', -1)))
+            if sent is not None and recorder.active:
+                recorder.broadcast.append(time.perf_counter() - sent)
+
+        @client.on('connect')
+        def on_connect(client=client):
+            client.emit('join_auction', {'auction_id': hot_auction})
+
+        client.connect(base_url, transports=['websocket'])
+        watchers.append(client)
+    return watchers
+
+
+def start_server(args, env, workdir):
+    """Start bench/server.py with its output in a log file (a pipe nobody drains would stall it)."""
+    log_path = os.path.join(workdir, 'server.log')
+    cmd = [sys.executable, SERVER, '--port', str(args.port), '--prepare',
+           '--users', str(args.users + args.abusers), '--auctions', str(args.auctions)]
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(cmd, env=env, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+
+    auction_ids = hot_price = None
+    while auction_ids is None and server.poll() is None:
+        time.sleep(0.2)
+        with open(log_path) as log:
+            for line in log:
+                if line.startswith('BENCH_READY'):
+                    fields = dict(part.split('=', 1) for part in line.split()[1:])
+                    auction_ids = [int(x) for x in fields['auctions'].split(',')]
+                    hot_price = float(fields['price'])
+    if auction_ids is None:
+        raise RuntimeError(f'bench server exited before it was ready, see {log_path}')
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=2).read()
+            return server, base_url, auction_ids, hot_price
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f'bench server did not start listening, see {log_path}')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(args, recorder, elapsed, database):
+    operations = {}
+    total = errors = 0
+    for op, samples in sorted(recorder.latencies.items()):
+        total += len(samples)
+        errors += recorder.errors[op]
+        operations[op] = {
+            'count': len(samples),
+            'errors': recorder.errors[op],
+            'rejected': recorder.rejected[op],
+            'rps': round(len(samples) / elapsed, 2),
+            **summarize_ms(samples),
+        }
+    return {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'database': database, 'duration_s': args.duration, 'users': args.users,
+                   'auctions': args.auctions, 'watchers': args.watchers, 'abusers': args.abusers,
+                   'think_time_s': args.think_time,
+                   'mix': TRAFFIC_MIX},
+        'elapsed_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'error_rate': round(errors / total, 4) if total else None,
+        'operations': operations,
+        'bid_broadcast': {'deliveries': len(recorder.broadcast), **summarize_ms(recorder.broadcast)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AuctionHub end-to-end load test.')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before recording')
+    parser.add_argument('--users', type=int, default=40, help='concurrent virtual users')
+    parser.add_argument('--auctions', type=int, default=20)
+    parser.add_argument('--watchers', type=int, default=10, help='Socket.IO clients in the hot auction room')
+    parser.add_argument('--abusers', type=int, default=0, help='extra users bidding on the hot auction non-stop')
+    parser.add_argument('--think-time', type=float, default=0.05, help='max random pause between actions')
+    parser.add_argument('--out', help='write the JSON report here as well as stdout')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='auction-bench-')
+    database = args.database_url or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    env = dict(os.environ, DATABASE_URL=database)
+    server, base_url, auction_ids, hot_price = start_server(args, env, workdir)
+    try:
+        recorder = Recorder()
+        hot_auction = auction_ids[0]
+        bid_clock = BidClock(start=int(hot_price) + 1)
+        users = [VirtualUser(base_url, f'bench{i}@example.com', auction_ids, hot_auction, bid_clock, recorder)
+                 for i in range(args.users)]
+        abusers = [VirtualUser(base_url, f'bench{i}@example.com', auction_ids, hot_auction, bid_clock, recorder)
+                   for i in range(args.users, args.users + args.abusers)]
+        for user in users + abusers:
+            user.login()
+        watchers = start_watchers(base_url, hot_auction, args.watchers, bid_clock, recorder)
+
+        deadline = time.monotonic() + args.warmup + args.duration
+        pool = eventlet.GreenPool(args.users + args.abusers)
+        for user in users:
+            pool.spawn(user.run, deadline, args.think_time)
+        for abuser in abusers:
+            pool.spawn(abuser.abuse, deadline)
+        eventlet.sleep(args.warmup)
+        recorder.active = True
+        started = time.monotonic()
+        pool.waitall()
+        elapsed = time.monotonic() - started
+        eventlet.sleep(0.5)  # let trailing broadcasts land
+        for watcher in watchers:
+            watcher.disconnect()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    report = build_report(args, recorder, elapsed, database.split('://')[0])
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
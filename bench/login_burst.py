@@ -0,0 +1,139 @@
+"""Bid broadcast latency while a burst of logins hits the server.
+
+For each mode (password hashing offloaded to the native thread pool, and
+inline on the event loop) this starts bench/server.py and keeps one bidder
+placing bids on the hot auction. Socket.IO watchers in the room time each bid
+from POST to ``bid_update``. After a quiet phase, --logins concurrent logins
+are fired at once. The report compares broadcast latency in both phases and
+counts logins that succeeded or were turned away by the admission gate.
+
+    python bench/login_burst.py --logins 200 --out login_burst.json
+    python bench/login_burst.py --modes inline --max-concurrent 4
+
+Needs the Socket.IO client extras: pip install "python-socketio[client]".
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from loadtest import (BENCH_PASSWORD, BidClock, Recorder, VirtualUser, git_commit, start_server,
+                      start_watchers, summarize_ms)
+
+MODES = {'offload': '1', 'inline': '0'}
+
+
+def bid_loop(bidder, stop, interval):
+    while not stop.ready():
+        bidder.step('bid')
+        eventlet.sleep(interval)
+
+
+def login_once(base_url, email, results):
+    user = VirtualUser(base_url, email, [], None, None, None)
+    start = time.perf_counter()
+    try:
+        status, body = user.request('/api/login', {'email': email, 'password': BENCH_PASSWORD})
+    except Exception:
+        status = None
+    elapsed = time.perf_counter() - start
+    if status == 200 and json.loads(body).get('success'):
+        results['ok'].append(elapsed)
+    elif status == 503:
+        results['busy'].append(elapsed)
+    else:
+        results['error'].append(elapsed)
+
+
+def run_mode(args, mode, workdir):
+    database = args.database_url or 'sqlite:///' + os.path.join(workdir, f'{mode}.db')
+    env = dict(os.environ, DATABASE_URL=database, PASSWORD_HASH_OFFLOAD=MODES[mode],
+               LOGIN_MAX_CONCURRENT=str(args.max_concurrent), PASSWORD_HASH_THREADS=str(args.threads))
+    server, base_url, auction_ids, hot_price = start_server(args, env, workdir)
+    try:
+        recorder = Recorder()
+        hot_auction = auction_ids[0]
+        bid_clock = BidClock(start=int(hot_price) + 1)
+        bidder = VirtualUser(base_url, 'bench0@example.com', auction_ids, hot_auction, bid_clock, recorder)
+        bidder.login()
+        watchers = start_watchers(base_url, hot_auction, args.watchers, bid_clock, recorder)
+        recorder.active = True
+
+        stop = eventlet.event.Event()
+        bidding = eventlet.spawn(bid_loop, bidder, stop, args.bid_interval)
+        eventlet.sleep(args.quiet)
+        quiet_count = len(recorder.broadcast)
+
+        results = {'ok': [], 'busy': [], 'error': []}
+        pool = eventlet.GreenPool(args.logins)
+        burst_started = time.monotonic()
+        for i in range(args.logins):
+            pool.spawn(login_once, base_url, f'bench{i % args.users}@example.com', results)
+        pool.waitall()
+        burst_elapsed = time.monotonic() - burst_started
+        stop.send()
+        bidding.wait()
+        eventlet.sleep(0.5)  # let trailing broadcasts land
+        for watcher in watchers:
+            watcher.disconnect()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        'broadcast_quiet': {'deliveries': quiet_count, **summarize_ms(recorder.broadcast[:quiet_count])},
+        'broadcast_burst': {'deliveries': len(recorder.broadcast) - quiet_count,
+                            **summarize_ms(recorder.broadcast[quiet_count:])},
+        'bids': {'count': len(recorder.latencies['bid']), 'errors': recorder.errors['bid'],
+                 **summarize_ms(recorder.latencies['bid'])},
+        'logins': {'burst_s': round(burst_elapsed, 2),
+                   **{outcome: len(samples) for outcome, samples in results.items()},
+                   **summarize_ms(results['ok'])},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bid broadcast latency during a login burst.')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file per mode')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--modes', default='offload,inline', help='comma separated: offload, inline')
+    parser.add_argument('--logins', type=int, default=100, help='concurrent logins in the burst')
+    parser.add_argument('--users', type=int, default=50, help='bench accounts the burst cycles through')
+    parser.add_argument('--auctions', type=int, default=5)
+    parser.add_argument('--watchers', type=int, default=5, help='Socket.IO clients in the hot auction room')
+    parser.add_argument('--quiet', type=float, default=5, help='seconds of bidding before the burst')
+    parser.add_argument('--bid-interval', type=float, default=0.05, help='pause between bids')
+    parser.add_argument('--max-concurrent', type=int, default=8, help='LOGIN_MAX_CONCURRENT for the server')
+    parser.add_argument('--threads', type=int, default=2, help='PASSWORD_HASH_THREADS for the server')
+    parser.add_argument('--out', help='write the JSON report here as well as stdout')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f'unknown mode(s): {", ".join(unknown)}')
+
+    workdir = tempfile.mkdtemp(prefix='auction-login-burst-')
+    results = {mode: run_mode(args, mode, workdir) for mode in modes}
+    report = {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'logins': args.logins, 'watchers': args.watchers, 'quiet_s': args.quiet,
+                   'bid_interval_s': args.bid_interval, 'max_concurrent': args.max_concurrent,
+                   'threads': args.threads},
+        'modes': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Run the app for benchmarks, optionally creating the schema and bench fixtures.
+
+Started by loadtest.py as a subprocess; DATABASE_URL must already be set.
+
+    python bench/server.py --port 5055 --prepare --users 50 --auctions 20
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models import db, User, Auction
+import realtime
+import stats
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_CATEGORIES = ['Watches', 'Collectibles', 'Art', 'Electronics', 'Books']
+
+
+def bench_email(i):
+    return f'bench{i}@example.com'
+
+
+def prepare(app, users, auctions):
+    """Create tables and idempotently insert bench users and auctions."""
+    with app.app_context():
+        db.create_all()
+        seller = db.session.query(User).filter_by(email='bench-seller@example.com').first()
+        if not seller:
+            # Hashing once and reusing it keeps fixture setup fast for many users.
+            password = generate_password_hash(BENCH_PASSWORD)
+            seller = User(name='Bench Seller', email='bench-seller@example.com', password=password,
+                          email_verified=True, created_at=datetime.now())
+            db.session.add(seller)
+            db.session.add_all(User(name=f'Bench User {i}', email=bench_email(i), password=password,
+                                    email_verified=True, created_at=datetime.now()) for i in range(users))
+            db.session.commit()
+
+        existing = db.session.query(Auction).filter_by(seller_id=seller.id).count()
+        now = datetime.now()
+        db.session.add_all(Auction(title=f'Bench Auction {i}', description='Load test item', starting_price=10,
+                                   current_price=10, end_time=now + timedelta(days=7), seller_id=seller.id,
+                                   category=BENCH_CATEGORIES[i % len(BENCH_CATEGORIES)], created_at=now)
+                           for i in range(existing, auctions))
+        db.session.commit()
+        stats.ensure_counters()
+
+        rows = db.session.query(Auction.id, Auction.current_price).filter_by(seller_id=seller.id).order_by(Auction.id).all()
+        # The first auction is the hot one; its price tells the driver where to start bidding.
+        print(f"BENCH_READY price={rows[0].current_price} auctions={','.join(str(row.id) for row in rows)}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--prepare', action='store_true', help='create tables and bench fixtures first')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--auctions', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(realtime_enabled=True)
+    if args.prepare:
+        prepare(app, args.users, args.auctions)
+    realtime.socketio.run(app, host=args.host, port=args.port, debug=False, log_output=False)
+
+
+if __name__ == '__main__':
+    main()
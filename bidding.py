@@ -0,0 +1,217 @@
+"""Bid placement and proxy (automatic) bidding.
+
+A bidder can set a maximum instead of bidding step by step. The server then
+bids for them, one ``PROXY_BID_INCREMENT`` above the competition, up to that
+maximum. A bid war between maxima is resolved in one pass: the highest
+maximum wins, at one increment above the runner-up's maximum (or at its own
+maximum if that is lower). Of two equal maxima the earlier one wins, while a
+manual bid equal to a maximum beats it. Only the outcome is written: the
+runner-up's bid at their maximum, the winner's bid at the new price, one
+``current_price`` update, one ``bid_update`` broadcast and one outbid
+notification. It replaces the POST-and-reload round trip per step.
+
+Manual bids from ``/api/bid`` go through the same resolution, so a standing
+maximum answers them straight away.
+
+Bids on one auction are serialized by a lock in this process. The price
+update also only applies if the price is still the one that was read, so a
+bid from another process is reported as a conflict and never lost.
+
+Bid history is paged with opaque cursors over ``(bid_time, id)``. Every bid,
+whether it is rendered, returned by ``/api/auction/<id>/bids`` or broadcast,
+carries its cursor. A client can then ask for the bids after the newest one it
+has (catch-up) or before the oldest one (scrolling back).
+"""
+import base64
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from helpers import create_notification
+from models import db
+import feeds
+import price_series
+import queries
+import realtime
+import user_cache
+
+PROXY_BID_INCREMENT = Decimal(os.getenv('PROXY_BID_INCREMENT', '1.00'))
+LOCK_STRIPES = 64
+CENT = Decimal('0.01')
+
+BidRow = namedtuple('BidRow', ['id', 'user_id', 'amount', 'bid_time'])
+
+_lock = threading.Lock()
+_stripes = None
+
+
+class BidRejected(Exception):
+    """The bid can't be accepted; the message is shown to the bidder."""
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _auction_lock(auction_id):
+    global _stripes
+    with _lock:
+        if _stripes is None:
+            # Created on first use, after eventlet has patched threading, so waiting yields to other greenlets.
+            _stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+    return _stripes[auction_id % LOCK_STRIPES]
+
+
+def resolve(price, leader_id, proxies, increment=PROXY_BID_INCREMENT):
+    """Outcome of the standing maxima against the current price and leader.
+
+    ``proxies`` are ``(user_id, max_amount, placed_at)`` rows. Returns
+    ``(new_price, new_leader_id, bids)`` where ``bids`` are the
+    ``(user_id, amount)`` rows to insert, in order.
+    """
+    standings = {}
+    for user_id, max_amount, placed_at in proxies:
+        max_amount = _money(max_amount)
+        if max_amount > price or user_id == leader_id:
+            standings[user_id] = (max_amount, placed_at)
+    if leader_id is not None:
+        # The leader's standing bid counts even without a maximum.
+        max_amount, placed_at = standings.get(leader_id, (price, datetime.min))
+        standings[leader_id] = (max(max_amount, price), placed_at)
+
+    ranked = sorted(standings.items(), key=lambda item: (-item[1][0], item[1][1]))
+    if not ranked:
+        return price, leader_id, []
+    winner_id, (winner_max, _) = ranked[0]
+    if len(ranked) == 1:
+        if winner_id == leader_id:
+            return price, leader_id, []
+        new_price = min(winner_max, price + increment)
+        return new_price, winner_id, [(winner_id, new_price)]
+
+    runner_id, (runner_max, _) = ranked[1]
+    new_price = min(winner_max, runner_max + increment)
+    bids = []
+    if price < runner_max < new_price:
+        bids.append((runner_id, runner_max))
+    if not (winner_id == leader_id and new_price == price):
+        bids.append((winner_id, new_price))
+    return new_price, winner_id, bids
+
+
+def cursor(bid_time, bid_id):
+    return base64.urlsafe_b64encode(f'{bid_time.isoformat()}|{bid_id}'.encode()).decode().rstrip('=')
+
+
+def parse_cursor(value):
+    """``(bid_time, bid_id)`` from a cursor; ValueError if it isn't one."""
+    # binascii.Error and UnicodeDecodeError are ValueErrors too.
+    raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+    bid_time, bid_id = raw.split('|')
+    return datetime.fromisoformat(bid_time), int(bid_id)
+
+
+def history(rows):
+    """Bid rows (id, user_id, amount, bid_time) as JSON-ready dicts with bidder names and cursors."""
+    names = user_cache.names([row.user_id for row in rows])
+    return [{'bidder_name': names.get(row.user_id, 'Anonymous'), 'bid_amount': float(row.amount),
+             'bid_time': row.bid_time.isoformat(), 'cursor': cursor(row.bid_time, row.id)} for row in rows]
+
+
+def _load(auction_id, user_id):
+    auction = queries.AUCTION_FOR_BID.first(auction_id=auction_id)
+    if not auction:
+        raise BidRejected('Auction not found')
+    if auction.seller_id == user_id:
+        raise BidRejected('You cannot bid on your own auction.')
+    if auction.end_time < datetime.now():
+        raise BidRejected('Auction has ended')
+    return auction
+
+
+def _settle(auction_id, auction, price, bids, now):
+    """Write the bid rows, their price buckets and the new price in one transaction. Returns the rows as written."""
+    old_price = auction.current_price
+    written = []
+    for i, (user_id, amount) in enumerate(bids):
+        # Consecutive timestamps keep the runner-up's row before the winner's in the history.
+        bid_time = now + timedelta(microseconds=i)
+        bid_id = queries.INSERT_BID.scalar(auction_id=auction_id, user_id=user_id, amount=float(amount), bid_time=bid_time)
+        written.append(BidRow(bid_id, user_id, amount, bid_time))
+    price_series.record(auction_id, [(row.bid_time, row.amount) for row in written])
+    if price != _money(old_price):
+        result = queries.UPDATE_CURRENT_PRICE.execute(new_price=float(price), auction_id=auction_id, old_price=old_price)
+        if result.rowcount != 1:
+            db.session.rollback()
+            raise BidRejected('Someone else just bid on this auction. Please try again.')
+    db.session.commit()
+    return written
+
+
+def _publish(auction_id, auction, previous_leader_id, leader_id, price, written, actor_id):
+    if not written:
+        return
+    # The bidder hears about their own outcome in the response.
+    if previous_leader_id is not None and previous_leader_id not in (leader_id, actor_id):
+        create_notification(previous_leader_id, f"You have been outbid on {auction.title}.", f"/auction/{auction_id}")
+
+    price_series.invalidate(auction_id)
+    feeds.record_bids(auction_id, price, [row.bid_time for row in written])
+    bids = history(written)
+    realtime.emit('bid_update', {
+        'auction_id': auction_id,
+        'new_price': float(price),
+        'bid_amount': float(price),
+        'bidder_name': bids[-1]['bidder_name'],
+        'bid_time': bids[-1]['bid_time'],
+        'bids': bids,
+    }, room=f"auction_{auction_id}")
+
+
+def place_bid(auction_id, user_id, amount):
+    """Place a manual bid, then let standing maxima answer it. Returns ``(leading, price)``."""
+    amount = _money(amount)
+    with _auction_lock(auction_id):
+        auction = _load(auction_id, user_id)
+        if amount <= _money(auction.current_price):
+            raise BidRejected('Bid must be higher than current price')
+        highest_bidder = queries.HIGHEST_BIDDER.first(auction_id=auction_id)
+        previous_leader_id = highest_bidder.user_id if highest_bidder else None
+        now = datetime.now()
+
+        price, leader_id, bids = resolve(amount, user_id, queries.PROXY_BIDS.all(auction_id=auction_id))
+        written = _settle(auction_id, auction, price, [(user_id, amount)] + bids, now)
+    _publish(auction_id, auction, previous_leader_id, leader_id, price, written, user_id)
+    return leader_id == user_id, price
+
+
+def set_max_bid(auction_id, user_id, max_amount):
+    """Set or raise ``user_id``'s maximum and resolve it against the others. Returns ``(leading, price)``."""
+    max_amount = _money(max_amount)
+    with _auction_lock(auction_id):
+        auction = _load(auction_id, user_id)
+        current_price = _money(auction.current_price)
+        highest_bidder = queries.HIGHEST_BIDDER.first(auction_id=auction_id)
+        previous_leader_id = highest_bidder.user_id if highest_bidder else None
+        existing = queries.MY_PROXY_BID.first(auction_id=auction_id, user_id=user_id)
+        if previous_leader_id == user_id:
+            if max_amount < current_price:
+                raise BidRejected('Your maximum cannot be below your current bid.')
+        elif max_amount <= current_price:
+            raise BidRejected('Your maximum must be higher than the current price.')
+        if existing and max_amount <= _money(existing.max_amount):
+            raise BidRejected('A maximum bid can only be raised.')
+        now = datetime.now()
+
+        if existing:
+            queries.UPDATE_PROXY_BID.execute(max_amount=float(max_amount), placed_at=now,
+                                             auction_id=auction_id, user_id=user_id)
+        else:
+            queries.INSERT_PROXY_BID.execute(auction_id=auction_id, user_id=user_id,
+                                             max_amount=float(max_amount), placed_at=now)
+        price, leader_id, bids = resolve(current_price, previous_leader_id, queries.PROXY_BIDS.all(auction_id=auction_id))
+        written = _settle(auction_id, auction, price, bids, now)
+    _publish(auction_id, auction, previous_leader_id, leader_id, price, written, user_id)
+    return leader_id == user_id, price
@@ -0,0 +1,147 @@
+"""Bulk admin actions: order status changes and auction deletes over many rows.
+
+Each chunk of up to ``BULK_CHUNK_SIZE`` ids is one transaction of set-based
+statements over an ``IN`` list, not a round trip per row. The notifications
+for a status change are written by a single INSERT ... SELECT. Each chunk
+sends one ``status_update`` emit carrying every changed order id. Auctions
+that have orders are never deleted; they are reported back as skipped.
+
+Selections larger than ``BULK_INLINE_LIMIT`` run as a background job, chunk
+by chunk, and the request returns at once. Jobs are kept in memory (the last
+``BULK_JOBS_KEPT``), and the admin pages poll ``/admin/jobs/<id>`` for progress.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from models import db, ORDER_STATUSES
+import feeds
+import queries
+import realtime
+import stats
+
+log = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 200))
+BULK_INLINE_LIMIT = int(os.getenv('BULK_INLINE_LIMIT', 200))
+BULK_JOBS_KEPT = 20
+
+_lock = threading.Lock()
+_jobs = OrderedDict()  # job id -> progress dict, oldest first
+_next_id = 1
+
+
+def update_order_status(order_ids, status):
+    """Move orders to ``status`` and notify their buyers. Returns ``(changed, skipped ids)``; none are skipped."""
+    previous = queries.CHANGING_ORDER_STATUSES.all(order_ids=order_ids, status=status)
+    if not previous:
+        return 0, []
+    notifications = queries.NOTIFY_ORDER_STATUS.all(order_ids=order_ids, status=status, link='/dashboard',
+                                                    is_read=False, created_at=datetime.now())
+    changed = [row.id for row in queries.UPDATE_ORDERS_STATUS.all(order_ids=order_ids, status=status)]
+    for old_status, count in previous:
+        # Statuses from before ORDER_STATUSES was enforced have no counter to take from.
+        if old_status in ORDER_STATUSES:
+            stats.bump(f"orders_status:{old_status}", -count)
+    stats.bump(f"orders_status:{status}", len(changed))
+    db.session.commit()
+
+    for notification in notifications:
+        payload = notification._asdict()
+        payload['created_at'] = payload['created_at'].isoformat()
+        realtime.emit('new_notification', payload, room=str(notification.user_id))
+    realtime.emit('status_update', {'order_ids': changed, 'status': status})
+    return len(changed), []
+
+
+def delete_auctions(auction_ids):
+    """Delete auctions with their bids, maxima, chart buckets and archives.
+
+    Auctions with orders are left alone: the order still points at them.
+    Returns ``(deleted, ids skipped because they have orders)``.
+    """
+    ordered = {row.auction_id for row in queries.AUCTIONS_WITH_ORDERS.all(auction_ids=auction_ids)}
+    skipped = sorted(ordered)
+    auction_ids = [auction_id for auction_id in auction_ids if auction_id not in ordered]
+    if not auction_ids:
+        return 0, skipped
+    for query in (queries.DELETE_AUCTIONS_BIDS, queries.DELETE_AUCTIONS_PROXY_BIDS,
+                  queries.DELETE_AUCTIONS_PRICE_BUCKETS, queries.DELETE_AUCTIONS_ARCHIVED_BIDS,
+                  queries.DELETE_AUCTIONS_BID_SUMMARIES):
+        query.execute(auction_ids=auction_ids)
+    deleted = queries.DELETE_AUCTIONS.execute(auction_ids=auction_ids).rowcount
+    # GMV only counts ordered auctions, which are never deleted, so it stays as it is.
+    stats.bump('auctions', -deleted)
+    db.session.commit()
+    for auction_id in auction_ids:
+        feeds.untrack(auction_id)
+    return deleted, skipped
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        yield ids[start:start + BULK_CHUNK_SIZE]
+
+
+def _new_job(label, total):
+    global _next_id
+    with _lock:
+        job = {'id': _next_id, 'label': label, 'total': total, 'done': 0, 'affected': 0, 'skipped': [],
+               'status': 'running', 'error': None, 'started_at': datetime.now().isoformat(timespec='seconds'),
+               'finished_at': None}
+        _jobs[_next_id] = job
+        _next_id += 1
+        while len(_jobs) > BULK_JOBS_KEPT:
+            _jobs.popitem(last=False)
+        return job
+
+
+def _run_job(app, job, action, ids, args):
+    with app.app_context():
+        try:
+            for chunk in _chunks(ids):
+                affected, skipped = action(chunk, *args)
+                with _lock:
+                    job['done'] += len(chunk)
+                    job['affected'] += affected
+                    job['skipped'] += skipped
+                realtime.sleep(0)  # let requests run between chunks
+            status, error = 'done', None
+        except Exception as e:
+            db.session.rollback()
+            log.exception("Bulk job failed", extra={'job': job['id'], 'label': job['label']})
+            status, error = 'failed', str(e)
+        finally:
+            db.session.remove()
+        with _lock:
+            job.update(status=status, error=error, finished_at=datetime.now().isoformat(timespec='seconds'))
+
+
+def run(label, action, ids, *args):
+    """Apply ``action(chunk, *args)``, which returns ``(affected, skipped ids)``, to ``ids`` in chunks.
+
+    Returns ``(job_id, None)`` when the work went to a background job, or
+    ``(None, (affected, skipped ids))`` when it was small enough to finish in
+    this request.
+    """
+    ids = sorted(set(ids))
+    if len(ids) <= BULK_INLINE_LIMIT or realtime.socketio is None:
+        affected, skipped = 0, []
+        for chunk in _chunks(ids):
+            chunk_affected, chunk_skipped = action(chunk, *args)
+            affected += chunk_affected
+            skipped += chunk_skipped
+        return None, (affected, skipped)
+    job = _new_job(label, len(ids))
+    realtime.start_background_task(_run_job, current_app._get_current_object(), job, action, ids, args)
+    return job['id'], None
+
+
+def job(job_id):
+    with _lock:
+        found = _jobs.get(job_id)
+        return dict(found) if found else None
@@ -0,0 +1,8 @@
+"""Extension instances shared across blueprints; bound to the app in create_app().
+
+Socket.IO is deliberately not here: it is created lazily by realtime.init_app so
+that CLI commands and scripts don't pay for importing it.
+"""
+from flask_caching import Cache
+
+cache = Cache()
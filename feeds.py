@@ -0,0 +1,251 @@
+"""Ranked "ending soon" and "hot" feeds for the home page, kept in memory.
+
+Both rankings are updated in place as auctions are created, edited, deleted
+and bid on, so serving the top ``FEED_SIZE`` is a slice. No sort and no
+aggregate over auctions or bids runs per request.
+
+* Ending soon: active auctions in a list sorted by ``(end_time, id)``.
+  Auctions that have ended drop off the front when a feed is read.
+* Hot: a decaying bid count per auction. Forward decay is used: a bid at
+  time ``t`` adds ``2 ** ((t - landmark) / HOT_HALF_LIFE_SECONDS)`` to its
+  auction's score. Dividing by the same weight taken at "now" gives a count in
+  which every bid's weight halves each half-life. Since "now" scales every
+  score alike, a bid only moves its own auction, and the top
+  ``HOT_CANDIDATES`` stay ranked without touching the others.
+
+The feeds are rebuilt from the database on first use, then every
+``FEEDS_RESYNC_SECONDS`` by a background task. That picks up writes made by
+other processes and moves the decay landmark forward before the weights grow
+large. If the resync keeps failing, bids and reads move the landmark forward
+themselves once a weight passes ``2 ** HOT_REBASE_EXPONENT``, well short of
+float overflow.
+"""
+import bisect
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from models import db
+import perf
+import queries
+import realtime
+import replicas
+
+log = logging.getLogger(__name__)
+
+FEED_SIZE = int(os.getenv('FEED_SIZE', 8))
+HOT_HALF_LIFE_SECONDS = float(os.getenv('HOT_HALF_LIFE_SECONDS', 900))
+FEEDS_RESYNC_SECONDS = int(os.getenv('FEEDS_RESYNC_SECONDS', 300))
+HOT_CANDIDATES = 2 * FEED_SIZE
+# Bids older than this many half-lives weigh under 0.1% of a new one and are skipped on rebuild.
+HOT_HORIZON_HALF_LIVES = 10
+# Weights overflow a float past 2 ** 1024; rebase long before that.
+HOT_REBASE_EXPONENT = 500
+
+_lock = threading.Lock()
+_loaded_at = None
+_landmark = None
+_cards = {}  # auction_id -> card dict, active auctions only
+_ending = []  # (end_time, auction_id), sorted
+_scores = {}  # auction_id -> decayed bid count, scaled to _landmark
+_hot = []  # up to HOT_CANDIDATES auction ids, highest score first
+_rebuilds = 0
+_refills = 0
+
+
+def _card(row):
+    card = row._asdict()
+    card['current_price'] = float(card['current_price'])
+    return card
+
+
+def _weight(moment):
+    return 2 ** ((moment - _landmark).total_seconds() / HOT_HALF_LIFE_SECONDS)
+
+
+def _rebase(now):
+    """Move the landmark to ``now`` if weights have grown too large, rescaling every score. Call with _lock held."""
+    global _landmark
+    exponent = (now - _landmark).total_seconds() / HOT_HALF_LIFE_SECONDS
+    if exponent <= HOT_REBASE_EXPONENT:
+        return
+    decay = 2 ** -exponent  # underflows to 0.0 rather than overflowing like _weight(now) could
+    for auction_id in _scores:
+        _scores[auction_id] *= decay
+    _landmark = now
+
+
+def _top(scores):
+    return heapq.nlargest(HOT_CANDIDATES, scores, key=scores.get)
+
+
+def load():
+    """Rebuild both feeds from the database."""
+    global _loaded_at, _landmark, _cards, _ending, _scores, _hot, _rebuilds
+    now = datetime.now()
+    since = now - timedelta(seconds=HOT_HORIZON_HALF_LIVES * HOT_HALF_LIFE_SECONDS)
+    with replicas.reading():
+        cards = {row.id: _card(row) for row in queries.FEED_AUCTIONS.all(now=now)}
+        bids = queries.RECENT_BIDS_ON_ACTIVE.all(now=now, since=since)
+    with _lock:
+        _landmark = now
+        scores = {}
+        for auction_id, bid_time in bids:
+            if auction_id in cards:
+                scores[auction_id] = scores.get(auction_id, 0.0) + _weight(bid_time)
+        _cards = cards
+        _ending = sorted((card['end_time'], auction_id) for auction_id, card in cards.items())
+        _scores = scores
+        _hot = _top(scores)
+        _loaded_at = now
+        _rebuilds += 1
+
+
+def _ensure_loaded():
+    if _loaded_at is None:
+        load()
+
+
+def _expire(now):
+    """Drop auctions that have ended. Call with _lock held."""
+    ended = bisect.bisect_right(_ending, (now, float('inf')))
+    if not ended:
+        return
+    for _, auction_id in _ending[:ended]:
+        _cards.pop(auction_id, None)
+        _scores.pop(auction_id, None)
+    del _ending[:ended]
+    _hot[:] = [auction_id for auction_id in _hot if auction_id in _cards]
+
+
+def _discard(auction_id):
+    """Take an auction out of both feeds. Call with _lock held."""
+    card = _cards.pop(auction_id, None)
+    if card is not None:
+        key = (card['end_time'], auction_id)
+        i = bisect.bisect_left(_ending, key)
+        if i < len(_ending) and _ending[i] == key:
+            del _ending[i]
+    _scores.pop(auction_id, None)
+    if auction_id in _hot:
+        _hot.remove(auction_id)
+
+
+def _rank(auction_id):
+    """Move an auction whose score just rose into place among the hot candidates. Call with _lock held."""
+    if auction_id not in _hot:
+        if len(_hot) >= HOT_CANDIDATES and _scores[auction_id] <= _scores[_hot[-1]]:
+            return
+        _hot.append(auction_id)
+    _hot.sort(key=_scores.get, reverse=True)
+    del _hot[HOT_CANDIDATES:]
+
+
+def track(auction_id):
+    """Add or refresh one auction after it was created or edited. Call after the commit."""
+    if _loaded_at is None:
+        return  # the first load reads it from the table
+    row = queries.FEED_AUCTION.first(auction_id=auction_id)
+    with _lock:
+        score = _scores.get(auction_id)
+        _discard(auction_id)
+        if row is None or row.end_time <= datetime.now():
+            return
+        card = _card(row)
+        _cards[auction_id] = card
+        bisect.insort(_ending, (card['end_time'], auction_id))
+        if score is not None:
+            _scores[auction_id] = score
+            _rank(auction_id)
+
+
+def untrack(auction_id):
+    with _lock:
+        _discard(auction_id)
+
+
+def record_bids(auction_id, price, bid_times):
+    """Count new bids on an auction and move its card's price."""
+    with _lock:
+        card = _cards.get(auction_id)
+        if card is None:
+            return
+        card['current_price'] = float(price)
+        _rebase(datetime.now())
+        _scores[auction_id] = _scores.get(auction_id, 0.0) + sum(_weight(moment) for moment in bid_times)
+        _rank(auction_id)
+
+
+def ending_soon(limit=FEED_SIZE):
+    """Active auctions closest to their end, soonest first, as card dicts."""
+    _ensure_loaded()
+    with _lock:
+        _expire(datetime.now())
+        return [dict(_cards[auction_id]) for _, auction_id in _ending[:limit]]
+
+
+def hot(limit=FEED_SIZE):
+    """Active auctions with the most recent bidding, as card dicts with a ``heat`` (decayed bid count)."""
+    global _refills
+    _ensure_loaded()
+    now = datetime.now()
+    with _lock:
+        _expire(now)
+        _rebase(now)
+        if len(_hot) < min(limit, len(_scores)):
+            # Ended auctions took too many candidates with them; pick again from every score.
+            _hot[:] = _top(_scores)
+            _refills += 1
+        scale = _weight(now)
+        return [dict(_cards[auction_id], heat=round(_scores[auction_id] / scale, 1)) for auction_id in _hot[:limit]]
+
+
+def _resync_loop(app, interval):
+    with app.app_context():
+        while True:
+            realtime.sleep(interval)
+            try:
+                load()
+            except Exception:
+                db.session.rollback()
+                log.exception("Error rebuilding feeds")
+            finally:
+                db.session.remove()
+
+
+def start_resync(app, interval=FEEDS_RESYNC_SECONDS):
+    """Launch the background task that rebuilds the feeds from the database."""
+    return realtime.start_background_task(_resync_loop, app, interval)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'loaded_at': _loaded_at.isoformat(timespec='seconds') if _loaded_at else None,
+            'active': len(_cards),
+            'scored': len(_scores),
+            'hot_candidates': len(_hot),
+            'rebuilds': _rebuilds,
+            'refills': _refills,
+            'feed_size': FEED_SIZE,
+            'half_life_s': HOT_HALF_LIFE_SECONDS,
+        }
+
+
+def render_prometheus():
+    with _lock:
+        return ['# HELP feeds_rebuilds_total Full rebuilds of the home page feeds from the database.',
+                '# TYPE feeds_rebuilds_total counter',
+                f'feeds_rebuilds_total {_rebuilds}',
+                '# HELP feeds_hot_refills_total Times the hot candidates ran short and were picked again.',
+                '# TYPE feeds_hot_refills_total counter',
+                f'feeds_hot_refills_total {_refills}',
+                '# HELP feeds_auctions Auctions tracked by the feeds.',
+                '# TYPE feeds_auctions gauge',
+                f'feeds_auctions{{feed="ending_soon"}} {len(_cards)}',
+                f'feeds_auctions{{feed="hot"}} {len(_scores)}']
+
+
+perf.register_collector(render_prometheus)
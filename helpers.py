@@ -0,0 +1,84 @@
+"""Helpers shared by the blueprints: notifications, template globals, auth decorators and uploads."""
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import session, redirect, url_for
+from models import db
+import queries
+import realtime
+import user_cache
+
+# Upload folder settings; the directory is created on first upload, not at import.
+UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "pdf", "webp", "bmp", "tiff", "svg"}
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# --- Notification Helper ---
+def create_notification(user_id, message, link):
+    # SQLAlchemy handles connections automatically within the request context
+    queries.INSERT_NOTIFICATION.execute(user_id=user_id, message=message, link=link, is_read=False, created_at=datetime.now())
+    db.session.commit()
+    notification = queries.LATEST_NOTIFICATION.first(user_id=user_id)._asdict()
+
+    if isinstance(notification['created_at'], datetime):
+        notification['created_at'] = notification['created_at'].isoformat()
+    realtime.emit('new_notification', notification, room=str(user_id))
+
+# --- Template globals ---
+def get_time_left(end_time_str):
+    """Calculate time left for an auction"""
+    try:
+        if end_time_str is None:
+            return "Unknown"
+        elif isinstance(end_time_str, str):
+            end_time = datetime.fromisoformat(end_time_str)
+        else:
+            end_time = end_time_str
+        now = datetime.now()
+        if end_time > now:
+            time_diff = end_time - now
+            days = time_diff.days
+            hours = time_diff.seconds // 3600
+            if days > 0:
+                return f"{days}d {hours}h left"
+            else:
+                return f"{hours}h left"
+        else:
+            return "Ended"
+    except Exception:
+        return "Unknown"
+
+def get_delivery_date(order_date_str):
+    """Calculate expected delivery date (7 days after order)."""
+    try:
+        if order_date_str is None:
+            return "Not available"
+        # Handle if the input is already a datetime object from the DB
+        elif isinstance(order_date_str, datetime):
+            order_date = order_date_str
+        else:
+            order_date = datetime.fromisoformat(order_date_str)
+
+        delivery_date = order_date + timedelta(days=7)
+        return delivery_date.strftime('%A, %b %d')
+    except (ValueError, TypeError, AttributeError):
+        return "Not available"
+
+def current_user():
+    """Cached attributes of the signed-in user, or None (see user_cache.py)."""
+    return user_cache.get(session.get('user_id'))
+
+# --- Admin Decorator ---
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Checked against the user row (cached), not the session, so demotions apply immediately.
+        user = current_user()
+        if not user or not user['is_admin']:
+            # Redirect non-admins to the homepage
+            return redirect(url_for('auctions.index'))
+        return f(*args, **kwargs)
+    return decorated_function
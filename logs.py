@@ -0,0 +1,266 @@
+"""Structured JSON logging that stays off the request path.
+
+``init_app`` points the root logger at a handler that only puts records on a
+bounded in-memory queue. A native thread (a real OS thread even under eventlet)
+drains the queue, formats each record as one JSON line and writes them to
+stderr in batches every ``LOG_FLUSH_SECONDS``. A slow terminal or log pipe
+therefore never stalls the event loop. When the queue is full, records are
+dropped and counted rather than blocking the caller.
+
+Cost controls, applied before a record is queued:
+
+* Sampling: below WARNING, records from routes listed in ``LOG_SAMPLE_RATES``
+  (``endpoint=rate,...``, e.g. ``account.get_dashboard_content=0.01``) are kept
+  for that fraction of requests. The decision is made once per request, so a
+  sampled request keeps all of its lines. ``LOG_SAMPLE_RATE`` is the default
+  for all other routes (1).
+* Error rate limiting: at most ``LOG_ERROR_BURST`` ERROR records with the same
+  message from the same route are logged per ``LOG_ERROR_WINDOW`` seconds. The
+  next one to get through carries a ``suppressed`` count.
+
+Each request gets an id from the ``X-Request-ID`` header, or a new one if the
+header is missing. The id is attached to every record logged during the
+request and echoed back in the response header.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+import perf
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_FLUSH_SECONDS = float(os.getenv('LOG_FLUSH_SECONDS', 0.5))
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1))
+LOG_ERROR_BURST = int(os.getenv('LOG_ERROR_BURST', 5))
+LOG_ERROR_WINDOW = float(os.getenv('LOG_ERROR_WINDOW', 60))
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=`` and is emitted as a field.
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'route'}
+
+_lock = threading.Lock()
+_handler = None
+_queued = 0
+_dropped = 0
+_sampled_out = 0
+_suppressed = 0
+
+
+def _parse_rates(value):
+    rates = {}
+    for item in value.split(','):
+        route, _, rate = item.partition('=')
+        if route.strip() and rate.strip():
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+LOG_SAMPLE_RATES = _parse_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+
+
+def _native():
+    """Unpatched threading, queue and time, so the writer is a real OS thread under eventlet."""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return patcher.original('threading'), patcher.original('queue'), patcher.original('time')
+    import queue
+    return threading, queue, time
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in ('request_id', 'route'):
+            if getattr(record, key, None):
+                entry[key] = getattr(record, key)
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Attaches the request id and route, then applies sampling and error rate limits."""
+
+    def __init__(self):
+        super().__init__()
+        self._errors = {}  # (logger, msg, route) -> [window start, logged in window, suppressed]
+        self._errors_lock = threading.Lock()
+
+    def filter(self, record):
+        global _sampled_out
+        route = None
+        if has_request_context():
+            route = request.endpoint or 'unmatched'
+            record.request_id = g.get('request_id')
+            record.route = route
+        if record.levelno < logging.WARNING:
+            if not self._sampled(route):
+                with _lock:
+                    _sampled_out += 1
+                return False
+        elif record.levelno >= logging.ERROR:
+            return self._admit_error(record, route)
+        return True
+
+    def _sampled(self, route):
+        if route is None:
+            return True
+        if 'log_sampled' not in g:
+            rate = LOG_SAMPLE_RATES.get(route, LOG_SAMPLE_RATE)
+            g.log_sampled = rate >= 1 or random.random() < rate
+        return g.log_sampled
+
+    def _admit_error(self, record, route):
+        global _suppressed
+        key = (record.name, record.msg, route)
+        now = time.monotonic()
+        with self._errors_lock:
+            state = self._errors.get(key)
+            if state is None or now - state[0] >= LOG_ERROR_WINDOW:
+                if len(self._errors) >= 1000:
+                    self._errors.clear()
+                suppressed = state[2] if state else 0
+                state = self._errors[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if state[1] >= LOG_ERROR_BURST:
+                state[2] += 1
+                with _lock:
+                    _suppressed += 1
+                return False
+            state[1] += 1
+        return True
+
+
+class BufferedHandler(logging.Handler):
+    """Queues records for a native writer thread; never blocks the caller."""
+
+    def __init__(self, stream=None, capacity=LOG_QUEUE_SIZE, interval=LOG_FLUSH_SECONDS):
+        super().__init__()
+        native_threading, native_queue, native_time = _native()
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.queue = native_queue.Queue(capacity)
+        self._empty = native_queue.Empty
+        self._sleep = native_time.sleep
+        self._write_lock = native_threading.Lock()
+        self._writer = native_threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        global _queued, _dropped
+        # Tracebacks reference live frames; render them now, everything else on the writer thread.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg, record.args = record.getMessage(), None
+        try:
+            self.queue.put_nowait(record)
+        except Exception:
+            with _lock:
+                _dropped += 1
+            return
+        with _lock:
+            _queued += 1
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            self._sleep(self.interval)  # let a batch build up behind the first record
+            self._write([record])
+
+    def flush(self):
+        self._write([])
+
+    def _write(self, records):
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except self._empty:
+                break
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if lines:
+            with self._write_lock:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except Exception:
+                    pass
+
+
+def _assign_request_id():
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:16]
+
+
+def _echo_request_id(response):
+    if 'request_id' in g:
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+
+def init_app(app):
+    """Install the JSON handler on the root logger (once per process) and the request id hooks."""
+    global _handler
+    if _handler is None:
+        _handler = BufferedHandler()
+        _handler.setFormatter(JsonFormatter())
+        _handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.handlers[:] = [_handler]
+        root.setLevel(LOG_LEVEL)
+        atexit.register(_handler.flush)
+        perf.register_collector(render_prometheus)
+    # Flask adds its own stream handler to app.logger in debug mode; send everything through ours.
+    app.logger.handlers.clear()
+    app.logger.propagate = True
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'queued': _queued,
+            'dropped': _dropped,
+            'sampled_out': _sampled_out,
+            'suppressed': _suppressed,
+            'backlog': _handler.queue.qsize() if _handler else 0,
+            'level': LOG_LEVEL,
+            'sample_rates': sorted(LOG_SAMPLE_RATES.items()),
+        }
+
+
+def render_prometheus():
+    with _lock:
+        return ['# HELP log_records_total Log records by what happened to them.',
+                '# TYPE log_records_total counter',
+                f'log_records_total{{outcome="queued"}} {_queued}',
+                f'log_records_total{{outcome="dropped"}} {_dropped}',
+                f'log_records_total{{outcome="sampled_out"}} {_sampled_out}',
+                f'log_records_total{{outcome="suppressed"}} {_suppressed}',
+                '# HELP log_queue_backlog Records waiting for the writer thread.',
+                '# TYPE log_queue_backlog gauge',
+                f'log_queue_backlog {_handler.queue.qsize() if _handler else 0}']
@@ -0,0 +1,151 @@
+"""Retention for the tables that grow with traffic: bids and notifications.
+
+* Bids: once an auction has been over for ``BID_COMPACT_AFTER_DAYS``, its
+  bids are compacted. Each bidder's highest bid stays in ``bids``, because
+  orders, My Bids and the bid history read it. Every other bid moves to
+  ``bids_archive``, and a ``bid_summaries`` row keeps the totals (bid and
+  bidder counts, first and last bid, high). The price chart keeps its own
+  buckets. This keeps ``bids`` and its index about the size of live bidding.
+* Notifications: read notifications older than ``NOTIFICATION_RETENTION_DAYS``
+  are deleted. Unread ones are kept.
+
+All moves and deletes go in batches of ``MAINTENANCE_BATCH_SIZE`` rows, one
+short transaction each, with a ``MAINTENANCE_PAUSE_SECONDS`` pause between
+them. Row locks are held briefly, and bidders never wait long behind the job.
+A background task runs a pass every ``MAINTENANCE_INTERVAL_SECONDS``;
+``python maintenance.py`` runs one by hand.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from models import db
+import perf
+import queries
+import realtime
+
+log = logging.getLogger(__name__)
+
+BID_COMPACT_AFTER_DAYS = int(os.getenv('BID_COMPACT_AFTER_DAYS', 30))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 30))
+MAINTENANCE_BATCH_SIZE = int(os.getenv('MAINTENANCE_BATCH_SIZE', 1000))
+MAINTENANCE_PAUSE_SECONDS = float(os.getenv('MAINTENANCE_PAUSE_SECONDS', 0.1))
+MAINTENANCE_INTERVAL_SECONDS = int(os.getenv('MAINTENANCE_INTERVAL_SECONDS', 3600))
+# Auctions compacted per pass; the rest wait for the next one.
+MAINTENANCE_AUCTIONS_PER_RUN = int(os.getenv('MAINTENANCE_AUCTIONS_PER_RUN', 500))
+
+_lock = threading.Lock()
+_totals = {'auctions_compacted': 0, 'bids_archived': 0, 'notifications_deleted': 0}
+_last_run = None
+
+
+def _pause():
+    if realtime.socketio is not None:
+        realtime.sleep(MAINTENANCE_PAUSE_SECONDS)
+    else:
+        time.sleep(MAINTENANCE_PAUSE_SECONDS)
+
+
+def compact_auction(auction_id, now):
+    """Archive all but each bidder's highest bid on one auction, then write its summary. Returns bids archived."""
+    bid_ids = [row.id for row in queries.SUPERSEDED_BIDS.all(auction_id=auction_id)]
+    for start in range(0, len(bid_ids), MAINTENANCE_BATCH_SIZE):
+        batch = bid_ids[start:start + MAINTENANCE_BATCH_SIZE]
+        queries.ARCHIVE_BIDS.execute(bid_ids=batch)
+        queries.DELETE_BIDS.execute(bid_ids=batch)
+        db.session.commit()
+        _pause()
+    # Written last: an auction without a summary is picked up again if a pass stops halfway.
+    queries.INSERT_BID_SUMMARY.execute(auction_id=auction_id, now=now)
+    db.session.commit()
+    return len(bid_ids)
+
+
+def compact_bids(now=None):
+    """Compact auctions that ended more than BID_COMPACT_AFTER_DAYS ago. Returns ``(auctions, bids archived)``."""
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=BID_COMPACT_AFTER_DAYS)
+    auction_ids = [row.id for row in queries.COMPACTABLE_AUCTIONS.all(cutoff=cutoff, limit=MAINTENANCE_AUCTIONS_PER_RUN)]
+    archived = 0
+    for auction_id in auction_ids:
+        archived += compact_auction(auction_id, now)
+    return len(auction_ids), archived
+
+
+def purge_notifications(now=None):
+    """Delete read notifications older than NOTIFICATION_RETENTION_DAYS. Returns how many went."""
+    cutoff = (now or datetime.now()) - timedelta(days=NOTIFICATION_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        count = queries.DELETE_READ_NOTIFICATIONS.execute(is_read=True, cutoff=cutoff,
+                                                          limit=MAINTENANCE_BATCH_SIZE).rowcount
+        db.session.commit()
+        deleted += count
+        if count < MAINTENANCE_BATCH_SIZE:
+            return deleted
+        _pause()
+
+
+def run(now=None):
+    """One maintenance pass. Returns what it did."""
+    global _last_run
+    now = now or datetime.now()
+    auctions, archived = compact_bids(now)
+    deleted = purge_notifications(now)
+    result = {'auctions_compacted': auctions, 'bids_archived': archived, 'notifications_deleted': deleted}
+    with _lock:
+        for key, value in result.items():
+            _totals[key] += value
+        _last_run = now
+    if auctions or deleted:
+        log.info("Maintenance pass done", extra=result)
+    return result
+
+
+def _maintenance_loop(app, interval):
+    with app.app_context():
+        while True:
+            try:
+                run()
+            except Exception:
+                db.session.rollback()
+                log.exception("Error running maintenance")
+            finally:
+                db.session.remove()
+            realtime.sleep(interval)
+
+
+def start(app, interval=MAINTENANCE_INTERVAL_SECONDS):
+    """Launch the background task that runs a maintenance pass every ``interval`` seconds."""
+    return realtime.start_background_task(_maintenance_loop, app, interval)
+
+
+def snapshot():
+    with _lock:
+        return dict(_totals, last_run=_last_run.isoformat(timespec='seconds') if _last_run else None,
+                    compact_after_days=BID_COMPACT_AFTER_DAYS, retention_days=NOTIFICATION_RETENTION_DAYS)
+
+
+def render_prometheus():
+    with _lock:
+        return ['# HELP maintenance_rows_total Rows moved or removed by retention maintenance.',
+                '# TYPE maintenance_rows_total counter',
+                f'maintenance_rows_total{{action="bids_archived"}} {_totals["bids_archived"]}',
+                f'maintenance_rows_total{{action="notifications_deleted"}} {_totals["notifications_deleted"]}',
+                '# HELP maintenance_auctions_compacted_total Ended auctions whose bids were compacted.',
+                '# TYPE maintenance_auctions_compacted_total counter',
+                f'maintenance_auctions_compacted_total {_totals["auctions_compacted"]}']
+
+
+perf.register_collector(render_prometheus)
+
+
+if __name__ == '__main__':
+    from app import create_app
+    app = create_app(realtime_enabled=False)
+    with app.app_context():
+        result = run()
+        print(f"🧹 Compacted {result['auctions_compacted']} auction(s), archived {result['bids_archived']} bid(s), "
+              f"deleted {result['notifications_deleted']} read notification(s).")
@@ -1,7 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+# RoutingSession sends reads in read-only views to replicas, see replicas.py.
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# TIMESTAMP WITHOUT TIME ZONE on Postgres either way; on SQLite, TIMESTAMP lets sqlite3 hand
+# raw text() queries real datetimes (see the SQLite settings in app.py).
+DateTime = db.DateTime().with_variant(db.TIMESTAMP(), 'sqlite')
+
+# Order lifecycle, in the order the admin panel offers them.
+ORDER_STATUSES = ['Ordered', 'Picked', 'Shipped', 'Delivered', 'Cancelled']
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -9,7 +19,7 @@ class User(db.Model):
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
     password = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
     email_verified = db.Column(db.Boolean, default=False)
     is_admin = db.Column(db.Boolean, default=False)
 
@@ -21,20 +31,64 @@ class Auction(db.Model):
     description = db.Column(db.Text, nullable=False)
     starting_price = db.Column(db.Numeric(10, 2), nullable=False)
     current_price = db.Column(db.Numeric(10, 2), nullable=False)
-    end_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(DateTime, nullable=False, index=True)
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category = db.Column(db.String(255), nullable=False)
     image_url = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
     history_link = db.Column(db.Text)
 
 class Bid(db.Model):
     __tablename__ = 'bids'
+    # Bid history pages seek on (auction_id, bid_time, id); see the cursors in bidding.py.
+    __table_args__ = (db.Index('ix_bids_auction_time_id', 'auction_id', 'bid_time', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
-    bid_time = db.Column(db.DateTime, default=datetime.utcnow)
+    bid_time = db.Column(DateTime, default=datetime.utcnow)
+
+class BidArchive(db.Model):
+    """Bids moved out of ``bids`` when an ended auction is compacted (see maintenance.py). Ids are kept."""
+    __tablename__ = 'bids_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    bid_time = db.Column(DateTime)
+
+class BidSummary(db.Model):
+    """Totals over every bid of a compacted auction, archived ones included."""
+    __tablename__ = 'bid_summaries'
+    auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), primary_key=True)
+    bids = db.Column(db.Integer, nullable=False)
+    bidders = db.Column(db.Integer, nullable=False)
+    first_bid_at = db.Column(DateTime)
+    last_bid_at = db.Column(DateTime)
+    high_amount = db.Column(db.Numeric(10, 2))
+    compacted_at = db.Column(DateTime, nullable=False)
+
+class ProxyBid(db.Model):
+    """A bidder's maximum for an auction; the server bids on their behalf up to it (see bidding.py)."""
+    __tablename__ = 'proxy_bids'
+    __table_args__ = (db.UniqueConstraint('auction_id', 'user_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    max_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    placed_at = db.Column(DateTime, default=datetime.utcnow)
+
+class PriceBucket(db.Model):
+    """Open/high/low/close of an auction's bids over one time bucket (see price_series.py)."""
+    __tablename__ = 'price_buckets'
+    auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)  # bucket width in seconds
+    bucket_start = db.Column(DateTime, primary_key=True)
+    open = db.Column(db.Numeric(10, 2), nullable=False)
+    high = db.Column(db.Numeric(10, 2), nullable=False)
+    low = db.Column(db.Numeric(10, 2), nullable=False)
+    close = db.Column(db.Numeric(10, 2), nullable=False)
+    bids = db.Column(db.Integer, nullable=False, default=0)
 
 class Order(db.Model):
     __tablename__ = 'orders'
@@ -44,7 +98,7 @@ class Order(db.Model):
     address = db.Column(db.Text, nullable=False)
     payment_status = db.Column(db.String(50), nullable=False)
     order_status = db.Column(db.String(50), default='Ordered')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
@@ -52,5 +106,11 @@ class Notification(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(DateTime, default=datetime.utcnow, index=True)  # retention scans by age
     link = db.Column(db.Text)
+
+class StatCounter(db.Model):
+    """A named running total, bumped in the same transaction as the row it counts."""
+    __tablename__ = 'stat_counters'
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
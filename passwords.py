@@ -0,0 +1,136 @@
+"""Password hashing off the event loop, with bounded login admission.
+
+werkzeug's hashes are deliberately slow (scrypt, ~50-100ms of CPU). Run inline
+on the single eventlet worker, every login froze all other requests and
+Socket.IO traffic for that long. When the app runs under eventlet the hash runs
+on eventlet's native thread pool (``tpool``) instead; hashlib releases the GIL
+while hashing, so the hub keeps serving.
+
+At most ``LOGIN_MAX_CONCURRENT`` logins/registrations are admitted at once.
+Extra requests wait up to ``LOGIN_ADMISSION_WAIT`` seconds for a slot and are
+then turned away with a 503 and ``Retry-After``. That stops a login burst from
+queueing unbounded work behind the hash threads.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import perf
+from perf import Histogram
+
+HASH_THREADS = int(os.getenv('PASSWORD_HASH_THREADS', 2))
+HASH_OFFLOAD = os.getenv('PASSWORD_HASH_OFFLOAD', '1') == '1'
+LOGIN_MAX_CONCURRENT = int(os.getenv('LOGIN_MAX_CONCURRENT', 8))
+LOGIN_ADMISSION_WAIT = float(os.getenv('LOGIN_ADMISSION_WAIT', 2))
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_admission = None
+_offload = False
+_hash_seconds = Histogram(HASH_BUCKETS)
+_admission_wait = Histogram(HASH_BUCKETS)
+_in_flight = 0
+_rejected = 0
+
+
+class Busy(Exception):
+    """No admission slot freed up in time; the client should retry later."""
+
+    retry_after = max(1, int(LOGIN_ADMISSION_WAIT))
+
+
+def init_app(app, offload=None):
+    """Size the hash pool and admission gate. Offloading defaults to on under eventlet."""
+    global _admission, _offload
+    if offload is None:
+        offload = HASH_OFFLOAD and _eventlet_patched()
+    _offload = offload
+    if offload:
+        from eventlet import tpool
+        tpool.set_num_threads(HASH_THREADS)
+    # Created here, after monkey patching, so it is a green semaphore under eventlet.
+    _admission = threading.BoundedSemaphore(LOGIN_MAX_CONCURRENT)
+    perf.register_collector(render_prometheus)
+
+
+def _eventlet_patched():
+    if 'eventlet' not in sys.modules:
+        return False
+    from eventlet import patcher
+    return patcher.is_monkey_patched('thread')
+
+
+@contextmanager
+def admitted():
+    """Hold one login admission slot for the duration of the block, or raise Busy."""
+    global _in_flight, _rejected
+    start = time.perf_counter()
+    if _admission is not None and not _admission.acquire(timeout=LOGIN_ADMISSION_WAIT):
+        with _lock:
+            _rejected += 1
+        raise Busy()
+    with _lock:
+        _admission_wait.observe(time.perf_counter() - start)
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight -= 1
+        if _admission is not None:
+            _admission.release()
+
+
+def _run(fn, *args):
+    start = time.perf_counter()
+    if _offload:
+        from eventlet import tpool
+        result = tpool.execute(fn, *args)
+    else:
+        result = fn(*args)
+    with _lock:
+        _hash_seconds.observe(time.perf_counter() - start)
+    return result
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password)
+
+
+def check_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'offload': _offload,
+            'threads': HASH_THREADS if _offload else 0,
+            'max_concurrent': LOGIN_MAX_CONCURRENT,
+            'in_flight': _in_flight,
+            'rejected': _rejected,
+            'hashes': _hash_seconds.total,
+            'hash_p95_ms': (_hash_seconds.quantile(0.95) or 0) * 1000,
+            'wait_p95_ms': (_admission_wait.quantile(0.95) or 0) * 1000,
+        }
+
+
+def render_prometheus():
+    with _lock:
+        lines = ['# HELP password_hash_duration_seconds Wall time of a password hash or check, queueing included.',
+                 '# TYPE password_hash_duration_seconds histogram']
+        lines += perf.histogram_lines('password_hash_duration_seconds', f'offload="{int(_offload)}"', _hash_seconds)
+        lines += ['# HELP login_admission_wait_seconds Time logins waited for an admission slot.',
+                  '# TYPE login_admission_wait_seconds histogram']
+        lines += perf.histogram_lines('login_admission_wait_seconds', 'gate="login"', _admission_wait)
+        lines += ['# HELP login_in_flight Logins and registrations currently admitted.',
+                  '# TYPE login_in_flight gauge',
+                  f'login_in_flight {_in_flight}',
+                  '# HELP login_rejected_total Logins turned away because no admission slot freed up.',
+                  '# TYPE login_rejected_total counter',
+                  f'login_rejected_total {_rejected}']
+    return lines
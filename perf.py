@@ -0,0 +1,253 @@
+"""Opt-in per-request profiling: route latency, SQL counts and a slow-query log.
+
+Enable with ``PERF_PROFILING=1``. Request timing comes from Flask request
+hooks, SQL timing from SQLAlchemy engine events and template time from Flask's
+render signals. Everything is kept in process memory and shown on
+``/admin/perf`` or exported in Prometheus text format.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PERF_ENABLED = os.getenv('PERF_PROFILING', '0') == '1'
+SLOW_QUERY_MS = float(os.getenv('PERF_SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG_SIZE = 200
+
+# Upper bounds (seconds / statements) of the histogram buckets, Prometheus style.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+_lock = threading.Lock()
+_collectors = []
+_installed = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum, as Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (an estimate)."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            yield bound, running
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.errors = 0
+
+
+_routes = {}
+_statements = {}  # normalized SQL -> [calls, total seconds, max seconds]
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|(?<!:):\w+|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Collapse literals and bind parameters so equal query shapes group together."""
+    sql = _LITERAL_RE.sub('?', statement)
+    sql = _IN_LIST_RE.sub('(?...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def register_collector(fn):
+    """Add a callable returning extra Prometheus text lines to the metrics export."""
+    if fn not in _collectors:
+        _collectors.append(fn)
+    return fn
+
+
+# --- SQLAlchemy engine events ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['perf_query_start'].pop()
+    route = '-'
+    if has_request_context():
+        g.perf_sql_count = g.get('perf_sql_count', 0) + 1
+        g.perf_sql_seconds = g.get('perf_sql_seconds', 0.0) + elapsed
+        route = request.endpoint or 'unmatched'
+    normalized = normalize_sql(statement)
+    with _lock:
+        entry = _statements.setdefault(normalized, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            _slow_queries.appendleft({'route': route, 'sql': normalized, 'ms': round(elapsed * 1000, 2),
+                                      'at': time.strftime('%Y-%m-%d %H:%M:%S')})
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start so later timings stay paired.
+    conn = exception_context.connection
+    if exception_context.cursor is not None and conn is not None and conn.info.get('perf_query_start'):
+        conn.info['perf_query_start'].pop()
+
+
+# --- Template render signals ---
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.perf_render_start = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if has_request_context() and 'perf_render_start' in g:
+        g.perf_render_seconds = g.get('perf_render_seconds', 0.0) + time.perf_counter() - g.pop('perf_render_start')
+
+
+# --- Flask request hooks ---
+
+def _start_request():
+    g.perf_start = time.perf_counter()
+
+
+def _finish_request(response):
+    if 'perf_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.perf_start
+    route = request.endpoint or 'unmatched'
+    with _lock:
+        stats = _routes.setdefault(route, RouteStats())
+        stats.latency.observe(elapsed)
+        stats.statements.observe(g.get('perf_sql_count', 0))
+        stats.db_seconds += g.get('perf_sql_seconds', 0.0)
+        stats.render_seconds += g.get('perf_render_seconds', 0.0)
+        if response.status_code >= 500:
+            stats.errors += 1
+    return response
+
+
+def init_app(app):
+    """Install the hooks when profiling is enabled; otherwise do nothing."""
+    global _installed
+    app.config.setdefault('PERF_PROFILING', PERF_ENABLED)
+    if not app.config['PERF_PROFILING'] or _installed:
+        return
+    _installed = True
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+        _statements.clear()
+        _slow_queries.clear()
+
+
+def snapshot():
+    """Per-route summaries, the heaviest statements and recent slow queries."""
+    with _lock:
+        routes = []
+        for name, stats in sorted(_routes.items()):
+            n = stats.latency.total or 1
+            routes.append({
+                'route': name,
+                'requests': stats.latency.total,
+                'errors': stats.errors,
+                'avg_ms': stats.latency.sum / n * 1000,
+                'p50_ms': stats.latency.quantile(0.5) * 1000,
+                'p95_ms': stats.latency.quantile(0.95) * 1000,
+                'p99_ms': stats.latency.quantile(0.99) * 1000,
+                'avg_statements': stats.statements.sum / n,
+                'avg_db_ms': stats.db_seconds / n * 1000,
+                'avg_render_ms': stats.render_seconds / n * 1000,
+            })
+        statements = sorted(({'sql': sql, 'calls': calls, 'total_ms': total * 1000, 'max_ms': worst * 1000}
+                             for sql, (calls, total, worst) in _statements.items()),
+                            key=lambda s: s['total_ms'], reverse=True)[:25]
+        return {'enabled': _installed, 'routes': routes, 'statements': statements,
+                'slow_queries': list(_slow_queries), 'slow_query_ms': SLOW_QUERY_MS}
+
+
+def label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def histogram_lines(name, labels, hist):
+    lines = []
+    for bound, count in hist.cumulative():
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {hist.sum}')
+    lines.append(f'{name}_count{{{labels}}} {hist.total}')
+    return lines
+
+
+def render_prometheus():
+    """All collected metrics in the Prometheus text exposition format."""
+    lines = [
+        '# HELP http_request_duration_seconds Request latency by route.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    with _lock:
+        routes = sorted(_routes.items())
+        for name, stats in routes:
+            lines += histogram_lines('http_request_duration_seconds', f'route="{label(name)}"', stats.latency)
+        lines += ['# HELP http_request_sql_statements SQL statements issued per request.',
+                  '# TYPE http_request_sql_statements histogram']
+        for name, stats in routes:
+            lines += histogram_lines('http_request_sql_statements', f'route="{label(name)}"', stats.statements)
+        lines += ['# HELP http_request_db_seconds_total Time spent in SQL per route.',
+                  '# TYPE http_request_db_seconds_total counter']
+        lines += [f'http_request_db_seconds_total{{route="{label(name)}"}} {stats.db_seconds}' for name, stats in routes]
+        lines += ['# HELP http_request_render_seconds_total Time spent rendering templates per route.',
+                  '# TYPE http_request_render_seconds_total counter']
+        lines += [f'http_request_render_seconds_total{{route="{label(name)}"}} {stats.render_seconds}' for name, stats in routes]
+        lines += ['# HELP http_request_errors_total Responses with a 5xx status per route.',
+                  '# TYPE http_request_errors_total counter']
+        lines += [f'http_request_errors_total{{route="{label(name)}"}} {stats.errors}' for name, stats in routes]
+    for collector in _collectors:
+        lines += collector()
+    return '\n'.join(lines) + '\n'
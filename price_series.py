@@ -0,0 +1,124 @@
+"""Downsampled price history per auction, for the chart on the auction page.
+
+Every bid is folded into open/high/low/close buckets at three resolutions
+(minute, hour, day) in ``price_buckets``. This happens in the same transaction
+that writes the bid (``record``, called from bidding.py). A chart request then
+reads at most ``PRICE_SERIES_POINTS`` bucket rows, however many bids the
+auction has. The packed result is cached until the next bid on that auction.
+
+Bids placed before the table existed are folded in by ``backfill``. Run
+``python price_series.py``; it only touches auctions that have no buckets yet.
+"""
+import os
+from datetime import datetime, timedelta
+
+from extensions import cache
+from models import db
+import queries
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+PRICE_SERIES_POINTS = int(os.getenv('PRICE_SERIES_POINTS', 120))
+PRICE_SERIES_CACHE_SECONDS = int(os.getenv('PRICE_SERIES_CACHE_SECONDS', 300))
+EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(moment, resolution):
+    seconds = int((moment - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % resolution)
+
+
+def _fold(bids, resolution):
+    """``{bucket_start: [open, high, low, close, count]}`` for ``(bid_time, amount)`` pairs in time order."""
+    buckets = {}
+    for bid_time, amount in bids:
+        amount = float(amount)
+        start = bucket_start(bid_time, resolution)
+        bucket = buckets.get(start)
+        if bucket is None:
+            buckets[start] = [amount, amount, amount, amount, 1]
+        else:
+            bucket[1] = max(bucket[1], amount)
+            bucket[2] = min(bucket[2], amount)
+            bucket[3] = amount
+            bucket[4] += 1
+    return buckets
+
+
+def record(auction_id, bids):
+    """Fold ``(bid_time, amount)`` pairs, in time order, into the auction's buckets.
+
+    Call inside the transaction that writes the bids. Each bucket is one
+    upsert, so two transactions opening the same bucket can't both insert it.
+    """
+    for resolution in RESOLUTIONS.values():
+        for start, (open_, high, low, close, count) in _fold(bids, resolution).items():
+            queries.UPSERT_PRICE_BUCKET.execute(auction_id=auction_id, resolution=resolution, bucket_start=start,
+                                                open=open_, high=high, low=low, close=close, bids=count)
+
+
+def _cache_key(auction_id, resolution_name):
+    return f'price_series:{auction_id}:{resolution_name}'
+
+
+def invalidate(auction_id):
+    cache.delete_many(*[_cache_key(auction_id, name) for name in list(RESOLUTIONS) + ['auto']])
+
+
+def _auto_resolution(auction_id):
+    """The finest resolution that covers the auction so far in PRICE_SERIES_POINTS buckets."""
+    span = queries.AUCTION_SPAN.first(auction_id=auction_id)
+    if span is None or span.created_at is None:
+        return 'hour'
+    seconds = (min(datetime.now(), span.end_time) - span.created_at).total_seconds()
+    for name, resolution in RESOLUTIONS.items():
+        if seconds / resolution <= PRICE_SERIES_POINTS:
+            return name
+    return 'day'
+
+
+def series(auction_id, resolution_name='auto'):
+    """The latest buckets, oldest first, packed as parallel arrays.
+
+    ``t`` holds each bucket's offset in seconds from ``start``.
+    """
+    key = _cache_key(auction_id, resolution_name)
+    packed = cache.get(key)
+    if packed is not None:
+        return packed
+
+    name = _auto_resolution(auction_id) if resolution_name == 'auto' else resolution_name
+    # Always from the primary: a lagging replica would be cached without the bid that just invalidated it.
+    rows = queries.PRICE_BUCKETS.all(bind=db.engine, auction_id=auction_id, resolution=RESOLUTIONS[name],
+                                     limit=PRICE_SERIES_POINTS)[::-1]
+    start = rows[0].bucket_start if rows else None
+    packed = {
+        'resolution': name,
+        'seconds': RESOLUTIONS[name],
+        'start': start.isoformat() if start else None,
+        't': [int((row.bucket_start - start).total_seconds()) for row in rows],
+        'o': [float(row.open) for row in rows],
+        'h': [float(row.high) for row in rows],
+        'l': [float(row.low) for row in rows],
+        'c': [float(row.close) for row in rows],
+        'n': [row.bids for row in rows],
+    }
+    cache.set(key, packed, timeout=PRICE_SERIES_CACHE_SECONDS)
+    return packed
+
+
+def backfill():
+    """Build buckets for auctions that have bids but none yet. Returns how many auctions were filled."""
+    auction_ids = [row.auction_id for row in queries.AUCTIONS_WITHOUT_PRICE_SERIES.all()]
+    for auction_id in auction_ids:
+        bids = queries.AUCTION_BIDS_IN_ORDER.all(auction_id=auction_id)
+        record(auction_id, [(bid.bid_time, bid.amount) for bid in bids])
+        db.session.commit()
+        invalidate(auction_id)
+    return len(auction_ids)
+
+
+if __name__ == '__main__':
+    from app import create_app
+    app = create_app(realtime_enabled=False)
+    with app.app_context():
+        print(f"📈 Price series built for {backfill()} auction(s).")
@@ -0,0 +1,405 @@
+"""Every SQL statement the app runs, declared once.
+
+Each ``Query`` wraps its ``text()`` clause, built once at import, so
+SQLAlchemy's compiled cache is hit on every call instead of re-parsing the
+string the route just built. Results come back as per-statement namedtuple
+classes (``MyBidsRow`` etc.). They are lighter than ``RowMapping`` and work
+the same in templates (``bid.amount``). Every call is timed per statement
+name for the Prometheus export and ``/admin/perf``.
+
+With ``DB_PREPARED_STATEMENTS=1`` on Postgres, statements run as named
+server-side prepared statements (``PREPARE``/``EXECUTE``), prepared once per
+connection. That only pays off when connections are reused, so it needs
+``DB_POOL_SIZE`` > 0; with the default NullPool every request would prepare
+again.
+"""
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import bindparam, text
+
+import perf
+from models import db
+from perf import Histogram
+
+PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', '0') == '1'
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+_PARAM = re.compile(r'(?<![:\w]):(\w+)')
+
+_lock = threading.Lock()
+registry = {}
+
+
+class Query:
+    def __init__(self, name, sql, expanding=()):
+        self.name = name
+        self.sql = sql
+        # Expanding parameters take a list and render as IN (...), one placeholder per item.
+        self.statement = text(sql).bindparams(*(bindparam(param, expanding=True) for param in expanding))
+        self.row_name = ''.join(part.title() for part in name.split('_')) + 'Row'
+        self._row_types = {}  # result keys -> namedtuple class
+        self._timing = Histogram(QUERY_BUCKETS)
+        self._rows = 0
+        # Positional form for PREPARE: each distinct :param becomes $n.
+        self._param_names = list(dict.fromkeys(_PARAM.findall(sql)))
+        self._prepared_sql = _PARAM.sub(lambda m: f'${self._param_names.index(m.group(1)) + 1}', sql)
+        self._preparable = '%' not in sql and not expanding
+        registry[name] = self
+
+    def _row_type(self, keys):
+        keys = tuple(keys)
+        row_type = self._row_types.get(keys)
+        if row_type is None:
+            row_type = self._row_types[keys] = namedtuple(self.row_name, keys, rename=True)
+        return row_type
+
+    def _execute(self, params, bind):
+        bind_arguments = {'bind': bind} if bind is not None else None
+        if PREPARED_STATEMENTS and self._preparable:
+            conn = db.session.connection(bind_arguments=bind_arguments)
+            if conn.dialect.name == 'postgresql':
+                return self._execute_prepared(conn, params)
+        return db.session.execute(self.statement, params, bind_arguments=bind_arguments)
+
+    def _execute_prepared(self, conn, params):
+        # Connection.info belongs to the DBAPI connection, so it survives pool checkouts.
+        prepared = conn.info.setdefault('prepared_queries', set())
+        if self.name not in prepared:
+            conn.exec_driver_sql(f'PREPARE q_{self.name} AS {self._prepared_sql}')
+            prepared.add(self.name)
+        if not self._param_names:
+            return conn.exec_driver_sql(f'EXECUTE q_{self.name}')
+        placeholders = ', '.join(['%s'] * len(self._param_names))
+        return conn.exec_driver_sql(f'EXECUTE q_{self.name}({placeholders})',
+                                    tuple(params[name] for name in self._param_names))
+
+    def _observe(self, start, rows):
+        elapsed = time.perf_counter() - start
+        with _lock:
+            self._timing.observe(elapsed)
+            self._rows += rows
+
+    def execute(self, bind=None, **params):
+        """Run a write; returns the result (for ``rowcount``)."""
+        start = time.perf_counter()
+        result = self._execute(params, bind)
+        self._observe(start, 0)
+        return result
+
+    def all(self, bind=None, **params):
+        start = time.perf_counter()
+        result = self._execute(params, bind)
+        row_type = self._row_type(result.keys())
+        rows = [row_type._make(row) for row in result]
+        self._observe(start, len(rows))
+        return rows
+
+    def first(self, bind=None, **params):
+        start = time.perf_counter()
+        result = self._execute(params, bind)
+        row = result.first()
+        if row is not None:
+            row = self._row_type(result.keys())._make(row)
+        self._observe(start, 0 if row is None else 1)
+        return row
+
+    def scalar(self, bind=None, **params):
+        start = time.perf_counter()
+        value = self._execute(params, bind).scalar()
+        self._observe(start, 1)
+        return value
+
+
+def snapshot():
+    with _lock:
+        stats = []
+        for query in registry.values():
+            hist = query._timing
+            if not hist.total:
+                continue
+            stats.append({
+                'name': query.name,
+                'calls': hist.total,
+                'avg_ms': hist.sum / hist.total * 1000,
+                'p95_ms': (hist.quantile(0.95) or 0) * 1000,
+                'total_ms': hist.sum * 1000,
+                'rows': query._rows,
+            })
+    return sorted(stats, key=lambda item: item['total_ms'], reverse=True)
+
+
+def render_prometheus():
+    lines = ['# HELP db_query_duration_seconds Execution plus fetch time per registered statement.',
+             '# TYPE db_query_duration_seconds histogram']
+    with _lock:
+        for name, query in sorted(registry.items()):
+            if query._timing.total:
+                lines += perf.histogram_lines('db_query_duration_seconds', f'query="{name}"', query._timing)
+        lines += ['# HELP db_query_rows_total Rows returned per registered statement.',
+                  '# TYPE db_query_rows_total counter']
+        lines += [f'db_query_rows_total{{query="{name}"}} {query._rows}'
+                  for name, query in sorted(registry.items()) if query._timing.total]
+    return lines
+
+
+perf.register_collector(render_prometheus)
+
+
+# --- Users ---
+
+USER_ATTRIBUTES = Query('user_attributes', 'SELECT name, email, created_at, email_verified, is_admin FROM users WHERE id = :user_id')
+USERS_ATTRIBUTES = Query('users_attributes', '''
+    SELECT id, name, email, created_at, email_verified, is_admin FROM users WHERE id IN :user_ids
+''', expanding=['user_ids'])
+USER_ID_BY_EMAIL = Query('user_id_by_email', 'SELECT id FROM users WHERE email = :email')
+USER_LOGIN = Query('user_login', 'SELECT id, name, password FROM users WHERE email = :email')
+INSERT_USER = Query('insert_user', '''
+    INSERT INTO users (name, email, password, created_at, email_verified)
+    VALUES (:name, :email, :password, :created_at, :email_verified)
+''')
+EMAIL_TAKEN = Query('email_taken', 'SELECT id FROM users WHERE email = :email AND id != :user_id')
+UPDATE_USER_NAME = Query('update_user_name', 'UPDATE users SET name = :name WHERE id = :user_id')
+UPDATE_USER_NAME_EMAIL = Query('update_user_name_email', 'UPDATE users SET name = :name, email = :email WHERE id = :user_id')
+SET_EMAIL_VERIFIED = Query('set_email_verified', 'UPDATE users SET email_verified = :verified WHERE id = :user_id')
+ADMIN_USERS = Query('admin_users', 'SELECT * FROM users ORDER BY created_at DESC')
+USER_DIRECTORY = Query('user_directory', 'SELECT id, name, email, created_at FROM users ORDER BY created_at ASC')
+USER_IS_ADMIN = Query('user_is_admin', 'SELECT is_admin FROM users WHERE id = :user_id')
+SET_USER_ADMIN = Query('set_user_admin', 'UPDATE users SET is_admin = :status WHERE id = :user_id')
+
+# --- Auctions ---
+
+ACTIVE_AUCTIONS = Query('active_auctions', 'SELECT * FROM auctions WHERE end_time > :now ORDER BY created_at DESC')
+ACTIVE_AUCTIONS_IN_CATEGORY = Query('active_auctions_in_category', '''
+    SELECT * FROM auctions WHERE end_time > :now AND category = :category ORDER BY created_at DESC
+''')
+AUCTION = Query('auction', 'SELECT * FROM auctions WHERE id = :auction_id')
+AUCTION_WITH_BID_COUNT = Query('auction_with_bid_count', '''
+    SELECT a.*, (SELECT COUNT(*) FROM bids WHERE auction_id = a.id) as bid_count FROM auctions a WHERE a.id = :auction_id
+''')
+AUCTION_FOR_BID = Query('auction_for_bid', 'SELECT title, current_price, end_time, seller_id FROM auctions WHERE id = :auction_id')
+AUCTION_FOR_ORDER = Query('auction_for_order', 'SELECT end_time, current_price FROM auctions WHERE id = :auction_id')
+UPDATE_AUCTION = Query('update_auction', '''
+    UPDATE auctions SET title = :title, description = :desc, end_time = :end_time, category = :cat,
+                        history_link = :hist, image_url = :img
+    WHERE id = :id
+''')
+# Only moves the price if nobody else moved it since it was read (see bidding.py).
+UPDATE_CURRENT_PRICE = Query('update_current_price', '''
+    UPDATE auctions SET current_price = :new_price WHERE id = :auction_id AND current_price = :old_price
+''')
+AUCTIONS_WITH_ORDERS = Query('auctions_with_orders', '''
+    SELECT DISTINCT auction_id FROM orders WHERE auction_id IN :auction_ids
+''', expanding=['auction_ids'])
+DELETE_AUCTIONS = Query('delete_auctions', 'DELETE FROM auctions WHERE id IN :auction_ids', expanding=['auction_ids'])
+ADMIN_AUCTIONS = Query('admin_auctions', '''
+    SELECT a.*, u.name as seller_name FROM auctions a JOIN users u ON a.seller_id = u.id ORDER BY a.created_at DESC
+''')
+ACTIVE_AUCTIONS_BY_CATEGORY = Query('active_auctions_by_category', '''
+    SELECT category, COUNT(*) FROM auctions WHERE end_time > :now GROUP BY category ORDER BY category
+''')
+# Card columns for the in-memory feeds (see feeds.py).
+FEED_AUCTIONS = Query('feed_auctions', '''
+    SELECT id, title, description, image_url, category, current_price, end_time FROM auctions WHERE end_time > :now
+''')
+FEED_AUCTION = Query('feed_auction', '''
+    SELECT id, title, description, image_url, category, current_price, end_time FROM auctions WHERE id = :auction_id
+''')
+
+# --- Bids ---
+
+# Bid history pages, keyed on the (auction_id, bid_time, id) index. Names come from user_cache, not a JOIN.
+LATEST_BIDS = Query('latest_bids', '''
+    SELECT id, user_id, amount, bid_time FROM bids WHERE auction_id = :auction_id
+    ORDER BY bid_time DESC, id DESC LIMIT :limit
+''')
+BIDS_BEFORE = Query('bids_before', '''
+    SELECT id, user_id, amount, bid_time FROM bids WHERE auction_id = :auction_id AND (bid_time, id) < (:bid_time, :bid_id)
+    ORDER BY bid_time DESC, id DESC LIMIT :limit
+''')
+BIDS_AFTER = Query('bids_after', '''
+    SELECT id, user_id, amount, bid_time FROM bids WHERE auction_id = :auction_id AND (bid_time, id) > (:bid_time, :bid_id)
+    ORDER BY bid_time ASC, id ASC LIMIT :limit
+''')
+HIGHEST_BIDDER = Query('highest_bidder', 'SELECT user_id FROM bids WHERE auction_id = :auction_id ORDER BY amount DESC LIMIT 1')
+WINNING_BID = Query('winning_bid', '''
+    SELECT user_id, amount FROM bids WHERE auction_id = :auction_id ORDER BY amount DESC, bid_time ASC LIMIT 1
+''')
+INSERT_BID = Query('insert_bid', '''
+    INSERT INTO bids (auction_id, user_id, amount, bid_time) VALUES (:auction_id, :user_id, :amount, :bid_time) RETURNING id
+''')
+DELETE_AUCTIONS_BIDS = Query('delete_auctions_bids', 'DELETE FROM bids WHERE auction_id IN :auction_ids', expanding=['auction_ids'])
+PROXY_BIDS = Query('proxy_bids', '''
+    SELECT user_id, max_amount, placed_at FROM proxy_bids WHERE auction_id = :auction_id ORDER BY max_amount DESC, placed_at ASC
+''')
+MY_PROXY_BID = Query('my_proxy_bid', 'SELECT max_amount FROM proxy_bids WHERE auction_id = :auction_id AND user_id = :user_id')
+INSERT_PROXY_BID = Query('insert_proxy_bid', '''
+    INSERT INTO proxy_bids (auction_id, user_id, max_amount, placed_at) VALUES (:auction_id, :user_id, :max_amount, :placed_at)
+''')
+UPDATE_PROXY_BID = Query('update_proxy_bid', '''
+    UPDATE proxy_bids SET max_amount = :max_amount, placed_at = :placed_at WHERE auction_id = :auction_id AND user_id = :user_id
+''')
+DELETE_AUCTIONS_PROXY_BIDS = Query('delete_auctions_proxy_bids', '''
+    DELETE FROM proxy_bids WHERE auction_id IN :auction_ids
+''', expanding=['auction_ids'])
+# The user's highest bid on each auction they bid on, newest first (dashboard and its My Bids tab).
+MY_BIDS = Query('my_bids', '''
+    WITH RankedBids AS (
+        SELECT b.user_id, b.auction_id, b.amount, b.bid_time,
+            ROW_NUMBER() OVER(PARTITION BY b.auction_id ORDER BY b.amount DESC, b.bid_time ASC) as rn
+        FROM bids b WHERE b.user_id = :user_id
+    )
+    SELECT a.id, a.title, rb.amount, rb.bid_time, a.current_price, a.end_time, (o.id IS NOT NULL) as is_ordered
+    FROM RankedBids rb JOIN auctions a ON rb.auction_id = a.id
+    LEFT JOIN orders o ON a.id = o.auction_id AND o.user_id = rb.user_id
+    WHERE rb.rn = 1 ORDER BY rb.bid_time DESC LIMIT :limit OFFSET :offset
+''')
+MY_AUCTIONS = Query('my_auctions', '''
+    SELECT a.*, COUNT(b.id) as bid_count
+    FROM auctions a LEFT JOIN bids b ON a.id = b.auction_id
+    WHERE a.seller_id = :user_id GROUP BY a.id ORDER BY a.created_at DESC
+    LIMIT :limit OFFSET :offset
+''')
+BIDS_SINCE = Query('bids_since', 'SELECT COUNT(*), MAX(id) FROM bids WHERE bid_time > :since')
+BIDS_AFTER_ID = Query('bids_after_id', 'SELECT COUNT(*), MAX(id) FROM bids WHERE id > :last_id')
+MAX_BID_ID = Query('max_bid_id', 'SELECT COALESCE(MAX(id), 0) FROM bids')
+RECENT_BIDS_ON_ACTIVE = Query('recent_bids_on_active', '''
+    SELECT b.auction_id, b.bid_time FROM auctions a JOIN bids b ON b.auction_id = a.id
+    WHERE a.end_time > :now AND b.bid_time > :since
+''')
+
+# --- Price series ---
+
+# Fold a batch of bids into a bucket: keep open, widen high/low, move close.
+# CASE rather than GREATEST/LEAST (Postgres) or MAX/MIN (SQLite) so it runs on both.
+UPSERT_PRICE_BUCKET = Query('upsert_price_bucket', '''
+    INSERT INTO price_buckets (auction_id, resolution, bucket_start, open, high, low, close, bids)
+    VALUES (:auction_id, :resolution, :bucket_start, :open, :high, :low, :close, :bids)
+    ON CONFLICT (auction_id, resolution, bucket_start) DO UPDATE SET
+        high = CASE WHEN price_buckets.high < excluded.high THEN excluded.high ELSE price_buckets.high END,
+        low = CASE WHEN price_buckets.low > excluded.low THEN excluded.low ELSE price_buckets.low END,
+        close = excluded.close, bids = price_buckets.bids + excluded.bids
+''')
+PRICE_BUCKETS = Query('price_buckets', '''
+    SELECT bucket_start, open, high, low, close, bids FROM price_buckets
+    WHERE auction_id = :auction_id AND resolution = :resolution ORDER BY bucket_start DESC LIMIT :limit
+''')
+AUCTION_BIDS_IN_ORDER = Query('auction_bids_in_order', '''
+    SELECT amount, bid_time FROM bids WHERE auction_id = :auction_id ORDER BY bid_time, id
+''')
+AUCTIONS_WITHOUT_PRICE_SERIES = Query('auctions_without_price_series', '''
+    SELECT a.id AS auction_id FROM auctions a
+    WHERE EXISTS (SELECT 1 FROM bids b WHERE b.auction_id = a.id)
+      AND NOT EXISTS (SELECT 1 FROM price_buckets p WHERE p.auction_id = a.id)
+''')
+AUCTION_SPAN = Query('auction_span', 'SELECT created_at, end_time FROM auctions WHERE id = :auction_id')
+DELETE_AUCTIONS_PRICE_BUCKETS = Query('delete_auctions_price_buckets', '''
+    DELETE FROM price_buckets WHERE auction_id IN :auction_ids
+''', expanding=['auction_ids'])
+
+# --- Orders ---
+
+USER_ORDER_FOR_AUCTION = Query('user_order_for_auction', 'SELECT id FROM orders WHERE auction_id = :auction_id AND user_id = :user_id')
+INSERT_ORDER = Query('insert_order', '''
+    INSERT INTO orders (auction_id, user_id, address, payment_status, order_status, created_at)
+    VALUES (:auction_id, :user_id, :address, :payment_status, :order_status, :created_at)
+''')
+MY_ORDERS = Query('my_orders', '''
+    SELECT o.id, a.title, o.address, o.payment_status, o.order_status, o.created_at, a.image_url, a.id as auction_id
+    FROM orders o JOIN auctions a ON o.auction_id = a.id WHERE o.user_id = :user_id
+    ORDER BY o.created_at DESC LIMIT :limit OFFSET :offset
+''')
+ADMIN_ORDERS = Query('admin_orders', '''
+    SELECT o.*, a.title as auction_title, u.name as buyer_name
+    FROM orders o JOIN auctions a ON o.auction_id = a.id JOIN users u ON o.user_id = u.id
+    ORDER BY o.created_at DESC
+''')
+# Bulk status changes (see bulk.py) touch only the orders whose status actually changes.
+CHANGING_ORDER_STATUSES = Query('changing_order_statuses', '''
+    SELECT order_status, COUNT(*) FROM orders WHERE id IN :order_ids AND order_status != :status GROUP BY order_status
+''', expanding=['order_ids'])
+NOTIFY_ORDER_STATUS = Query('notify_order_status', '''
+    INSERT INTO notifications (user_id, message, link, is_read, created_at)
+    SELECT user_id, 'Your order #' || id || ' has been updated to ' || :status || '.', :link, :is_read, :created_at
+    FROM orders WHERE id IN :order_ids AND order_status != :status
+    RETURNING id, user_id, message, link, is_read, created_at
+''', expanding=['order_ids'])
+UPDATE_ORDERS_STATUS = Query('update_orders_status', '''
+    UPDATE orders SET order_status = :status WHERE id IN :order_ids AND order_status != :status RETURNING id
+''', expanding=['order_ids'])
+
+# --- Notifications ---
+
+INSERT_NOTIFICATION = Query('insert_notification', '''
+    INSERT INTO notifications (user_id, message, link, is_read, created_at) VALUES (:user_id, :message, :link, :is_read, :created_at)
+''')
+LATEST_NOTIFICATION = Query('latest_notification', '''
+    SELECT * FROM notifications WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 1
+''')
+RECENT_NOTIFICATIONS = Query('recent_notifications', '''
+    SELECT * FROM notifications WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 10
+''')
+UNREAD_NOTIFICATION_COUNT = Query('unread_notification_count', '''
+    SELECT COUNT(*) FROM notifications WHERE user_id = :user_id AND is_read = :is_read
+''')
+MARK_NOTIFICATIONS_READ = Query('mark_notifications_read', 'UPDATE notifications SET is_read = :is_read WHERE user_id = :user_id')
+
+# --- Retention (see maintenance.py) ---
+
+COMPACTABLE_AUCTIONS = Query('compactable_auctions', '''
+    SELECT a.id FROM auctions a
+    WHERE a.end_time < :cutoff AND NOT EXISTS (SELECT 1 FROM bid_summaries s WHERE s.auction_id = a.id)
+    ORDER BY a.end_time LIMIT :limit
+''')
+# Every bid except each bidder's highest, which orders, My Bids and the history still read.
+SUPERSEDED_BIDS = Query('superseded_bids', '''
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY amount DESC, id DESC) AS rn
+        FROM bids WHERE auction_id = :auction_id
+    ) ranked WHERE rn > 1
+''')
+ARCHIVE_BIDS = Query('archive_bids', '''
+    INSERT INTO bids_archive (id, auction_id, user_id, amount, bid_time)
+    SELECT id, auction_id, user_id, amount, bid_time FROM bids WHERE id IN :bid_ids
+''', expanding=['bid_ids'])
+DELETE_BIDS = Query('delete_bids', 'DELETE FROM bids WHERE id IN :bid_ids', expanding=['bid_ids'])
+INSERT_BID_SUMMARY = Query('insert_bid_summary', '''
+    INSERT INTO bid_summaries (auction_id, bids, bidders, first_bid_at, last_bid_at, high_amount, compacted_at)
+    SELECT :auction_id, COUNT(*), COUNT(DISTINCT user_id), MIN(bid_time), MAX(bid_time), MAX(amount), :now FROM (
+        SELECT user_id, amount, bid_time FROM bids WHERE auction_id = :auction_id
+        UNION ALL
+        SELECT user_id, amount, bid_time FROM bids_archive WHERE auction_id = :auction_id
+    ) all_bids
+''')
+BID_SUMMARY = Query('bid_summary', 'SELECT * FROM bid_summaries WHERE auction_id = :auction_id')
+DELETE_AUCTIONS_ARCHIVED_BIDS = Query('delete_auctions_archived_bids', '''
+    DELETE FROM bids_archive WHERE auction_id IN :auction_ids
+''', expanding=['auction_ids'])
+DELETE_AUCTIONS_BID_SUMMARIES = Query('delete_auctions_bid_summaries', '''
+    DELETE FROM bid_summaries WHERE auction_id IN :auction_ids
+''', expanding=['auction_ids'])
+# One batch of expired read notifications; callers repeat until fewer than :limit go.
+DELETE_READ_NOTIFICATIONS = Query('delete_read_notifications', '''
+    DELETE FROM notifications WHERE id IN (
+        SELECT id FROM notifications WHERE is_read = :is_read AND created_at < :cutoff ORDER BY created_at LIMIT :limit
+    )
+''')
+
+# --- Stat counters (see stats.py) ---
+
+BUMP_COUNTER = Query('bump_counter', 'UPDATE stat_counters SET value = value + :delta WHERE name = :name')
+COUNTER_NAMES = Query('counter_names', 'SELECT name FROM stat_counters')
+ALL_COUNTERS = Query('all_counters', 'SELECT name, value FROM stat_counters')
+# Creates a missing counter; a row another transaction created first wins.
+SEED_COUNTER = Query('seed_counter', '''
+    INSERT INTO stat_counters (name, value) VALUES (:name, :value) ON CONFLICT (name) DO NOTHING
+''')
+COUNT_USERS = Query('count_users', 'SELECT COUNT(*) FROM users')
+COUNT_AUCTIONS = Query('count_auctions', 'SELECT COUNT(*) FROM auctions')
+COUNT_ORDERS = Query('count_orders', 'SELECT COUNT(*) FROM orders')
+COUNT_ORDERS_WITH_STATUS = Query('count_orders_with_status', 'SELECT COUNT(*) FROM orders WHERE order_status = :status')
+ORDERS_GMV = Query('orders_gmv', '''
+    SELECT COALESCE(SUM(a.current_price), 0) FROM orders o JOIN auctions a ON o.auction_id = a.id
+''')
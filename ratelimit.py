@@ -0,0 +1,190 @@
+"""Admission control for /api/bid: token buckets plus a concurrency cap.
+
+Each bid takes one token from the bidder's bucket and one from the auction's
+bucket. Buckets refill continuously at ``rate`` tokens per second up to
+``burst``. On top of that, at most ``BID_MAX_CONCURRENT`` bids are processed
+at once by this worker. Anything over a limit is answered straight away with
+429 and ``Retry-After``, before touching the database, so a scripted bidder
+can't crowd out everyone else.
+
+Buckets live in process memory by default. With several workers or hosts,
+set ``RATE_LIMIT_REDIS_URL`` to share them through Redis (needs the ``redis``
+package); any object with the ``take`` method of ``MemoryBackend`` can be
+plugged in with ``set_backend``. A negative ``cost`` puts tokens back, which
+is how a bidder's token is refunded when the auction's bucket turns the bid
+away.
+"""
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request, session
+
+import perf
+
+BID_RATE_USER = float(os.getenv('BID_RATE_USER', 2))
+BID_BURST_USER = float(os.getenv('BID_BURST_USER', 5))
+BID_RATE_AUCTION = float(os.getenv('BID_RATE_AUCTION', 20))
+BID_BURST_AUCTION = float(os.getenv('BID_BURST_AUCTION', 40))
+BID_MAX_CONCURRENT = int(os.getenv('BID_MAX_CONCURRENT', 16))
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL')
+MAX_MEMORY_BUCKETS = 100000
+
+_lock = threading.Lock()
+_backend = None
+_in_flight = 0
+_admitted = 0
+_shed = {'user': 0, 'auction': 0, 'concurrency': 0}
+
+
+class MemoryBackend:
+    """Token buckets in a dict; fine for the single eventlet worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, updated_at, rate, burst]
+
+    def take(self, key, rate, burst, cost=1):
+        """Take ``cost`` tokens (a negative cost refunds). Returns (allowed, seconds until enough are available)."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_MEMORY_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[key] = [burst, now, rate, burst]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = min(burst, tokens - cost)
+                return True, 0.0
+            bucket[0] = tokens
+            return False, (cost - tokens) / rate
+
+    def _prune(self, now):
+        # A bucket that has refilled completely is the same as no bucket.
+        full = [key for key, (tokens, updated, rate, burst) in self._buckets.items()
+                if tokens + (now - updated) * rate >= burst]
+        for key in full:
+            del self._buckets[key]
+
+
+class RedisBackend:
+    """Token buckets shared by every worker, updated atomically by a Lua script."""
+
+    SCRIPT = """
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = math.min(burst, tokens - cost)
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst, cost=1):
+        allowed, tokens = self._take(keys=[f'ratelimit:{key}'], args=[rate, burst, cost, time.time()])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBackend()
+    return _backend
+
+
+def _too_many(reason, retry_after):
+    with _lock:
+        _shed[reason] += 1
+    response = jsonify({'success': False, 'message': 'Too many bids right now, please wait a moment and try again.'})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+
+def limit_bids(f):
+    """Shed /api/bid calls over the per-user, per-auction or concurrency limits with a 429."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        global _in_flight, _admitted
+        with _lock:
+            if _in_flight >= BID_MAX_CONCURRENT:
+                full = True
+            else:
+                full = False
+                _in_flight += 1
+        if full:
+            return _too_many('concurrency', 1)
+        try:
+            backend = get_backend()
+            user_key = session.get('user_id') or request.remote_addr
+            user_bucket = f'bid:user:{user_key}'
+            allowed, retry_after = backend.take(user_bucket, BID_RATE_USER, BID_BURST_USER)
+            if not allowed:
+                return _too_many('user', retry_after)
+            try:
+                # The same int() the view applies, so "1", "01" and 1.0 all share auction 1's bucket.
+                auction_id = int((request.get_json(silent=True) or {}).get('auction_id'))
+            except (TypeError, ValueError):
+                auction_id = None  # the view answers with its validation error
+            if auction_id is not None:
+                allowed, retry_after = backend.take(f'bid:auction:{auction_id}', BID_RATE_AUCTION, BID_BURST_AUCTION)
+                if not allowed:
+                    # The bid never ran, so it shouldn't count against the bidder.
+                    backend.take(user_bucket, BID_RATE_USER, BID_BURST_USER, cost=-1)
+                    return _too_many('auction', retry_after)
+            with _lock:
+                _admitted += 1
+            return f(*args, **kwargs)
+        finally:
+            with _lock:
+                _in_flight -= 1
+    return decorated_function
+
+
+def snapshot():
+    with _lock:
+        return {
+            'backend': type(get_backend()).__name__,
+            'in_flight': _in_flight,
+            'max_concurrent': BID_MAX_CONCURRENT,
+            'admitted': _admitted,
+            'shed': dict(_shed),
+        }
+
+
+def render_prometheus():
+    with _lock:
+        lines = ['# HELP bid_admitted_total Bids that passed admission control.',
+                 '# TYPE bid_admitted_total counter',
+                 f'bid_admitted_total {_admitted}',
+                 '# HELP bid_shed_total Bids answered with 429, by the limit that was hit.',
+                 '# TYPE bid_shed_total counter']
+        lines += [f'bid_shed_total{{reason="{reason}"}} {count}' for reason, count in sorted(_shed.items())]
+        lines += ['# HELP bid_in_flight Bids being processed right now.',
+                  '# TYPE bid_in_flight gauge',
+                  f'bid_in_flight {_in_flight}']
+    return lines
+
+
+perf.register_collector(render_prometheus)
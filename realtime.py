@@ -0,0 +1,169 @@
+"""Socket.IO setup plus Socket.IO and event-loop instrumentation.
+
+``init_app`` creates the SocketIO server only when the app serves realtime
+traffic, so CLI commands and scripts never import it.
+
+Counts connected clients and auction-room joins, times every emit per event
+type (the call covers payload encoding and fan-out to the room), and runs a
+sampler greenlet that measures how late the eventlet hub wakes it up. A hub
+that is consistently late means the single worker is saturated. The numbers
+are added to the Prometheus export in ``perf`` and shown on ``/admin/perf``.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import perf
+from perf import Histogram
+
+HUB_SAMPLE_SECONDS = float(os.getenv('HUB_SAMPLE_SECONDS', 0.5))
+EMIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+HUB_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+RATE_WINDOW_SECONDS = 60
+
+_lock = threading.Lock()
+socketio = None
+_connected = 0
+_room_joins = 0
+_emits = {}  # event -> Histogram of emit seconds
+_recent_emits = {}  # event -> deque of [second, count]
+_hub_lag = Histogram(HUB_LAG_BUCKETS)
+_hub_lag_max = 0.0
+_hub_lag_last = 0.0
+
+
+def client_connected():
+    global _connected
+    with _lock:
+        _connected += 1
+
+
+def client_disconnected():
+    global _connected
+    with _lock:
+        _connected = max(0, _connected - 1)
+
+
+def room_joined():
+    global _room_joins
+    with _lock:
+        _room_joins += 1
+
+
+def emit(event, data, **kwargs):
+    """socketio.emit, timed and counted per event name."""
+    if socketio is None:
+        # Realtime is off (CLI commands, scripts): there is nobody to send to.
+        return
+    start = time.perf_counter()
+    socketio.emit(event, data, **kwargs)
+    elapsed = time.perf_counter() - start
+    second = int(time.time())
+    with _lock:
+        _emits.setdefault(event, Histogram(EMIT_BUCKETS)).observe(elapsed)
+        recent = _recent_emits.setdefault(event, deque())
+        if recent and recent[-1][0] == second:
+            recent[-1][1] += 1
+        else:
+            recent.append([second, 1])
+        while recent and recent[0][0] <= second - RATE_WINDOW_SECONDS:
+            recent.popleft()
+
+
+def room_sizes():
+    """Clients per ``auction_<id>`` room, read from the Socket.IO manager."""
+    manager = getattr(getattr(socketio, 'server', None), 'manager', None)
+    rooms = getattr(manager, 'rooms', {}).get('/', {})
+    return {room: len(members) for room, members in list(rooms.items())
+            if isinstance(room, str) and room.startswith('auction_')}
+
+
+def _sample_hub_lag(interval):
+    global _hub_lag_max, _hub_lag_last
+    while True:
+        start = time.perf_counter()
+        socketio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        with _lock:
+            _hub_lag.observe(lag)
+            _hub_lag_last = lag
+            _hub_lag_max = max(_hub_lag_max, lag)
+
+
+def init_app(app):
+    """Create the SocketIO server for ``app`` and register the socket event handlers."""
+    global socketio
+    from flask_socketio import SocketIO
+    from views import sockets
+
+    # For production servers like Render using eventlet, we don't need to force 'threading'.
+    # For platforms like PythonAnywhere, async_mode='threading' is required.
+    # Let SocketIO auto-detect the best async mode.
+    socketio = SocketIO(app)
+    sockets.register(socketio)
+    perf.register_collector(render_prometheus)
+    return socketio
+
+
+def start_background_task(target, *args, **kwargs):
+    return socketio.start_background_task(target, *args, **kwargs)
+
+
+def sleep(seconds):
+    socketio.sleep(seconds)
+
+
+def start_hub_sampler(interval=HUB_SAMPLE_SECONDS):
+    """Launch the greenlet that measures event-loop (hub) latency."""
+    return start_background_task(_sample_hub_lag, interval)
+
+
+def snapshot():
+    now = int(time.time())
+    with _lock:
+        events = []
+        for event, hist in sorted(_emits.items()):
+            recent = sum(count for second, count in _recent_emits.get(event, ())
+                         if second > now - RATE_WINDOW_SECONDS)
+            events.append({
+                'event': event,
+                'emits': hist.total,
+                'per_minute': recent * 60 / RATE_WINDOW_SECONDS,
+                'avg_ms': hist.sum / hist.total * 1000 if hist.total else 0.0,
+                'p95_ms': (hist.quantile(0.95) or 0) * 1000,
+            })
+        result = {
+            'connected': _connected,
+            'room_joins': _room_joins,
+            'events': events,
+            'hub_lag_last_ms': _hub_lag_last * 1000,
+            'hub_lag_max_ms': _hub_lag_max * 1000,
+            'hub_lag_p95_ms': (_hub_lag.quantile(0.95) or 0) * 1000,
+        }
+    rooms = room_sizes()
+    result['rooms'] = sorted(rooms.items(), key=lambda item: item[1], reverse=True)[:20]
+    result['room_count'] = len(rooms)
+    return result
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        lines += ['# HELP socketio_connected_clients Currently connected Socket.IO clients.',
+                  '# TYPE socketio_connected_clients gauge',
+                  f'socketio_connected_clients {_connected}',
+                  '# HELP socketio_room_joins_total Auction room joins.',
+                  '# TYPE socketio_room_joins_total counter',
+                  f'socketio_room_joins_total {_room_joins}',
+                  '# HELP socketio_emit_duration_seconds Time spent in socketio.emit per event.',
+                  '# TYPE socketio_emit_duration_seconds histogram']
+        for event, hist in sorted(_emits.items()):
+            lines += perf.histogram_lines('socketio_emit_duration_seconds', f'event="{perf.label(event)}"', hist)
+        lines += ['# HELP eventlet_hub_lag_seconds How late the hub woke the sampler greenlet.',
+                  '# TYPE eventlet_hub_lag_seconds histogram']
+        lines += perf.histogram_lines('eventlet_hub_lag_seconds', 'sampler="hub"', _hub_lag)
+    lines += ['# HELP socketio_room_clients Clients in each auction room.',
+              '# TYPE socketio_room_clients gauge']
+    lines += [f'socketio_room_clients{{room="{perf.label(room)}"}} {size}' for room, size in sorted(room_sizes().items())]
+    return lines
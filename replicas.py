@@ -0,0 +1,185 @@
+"""Read/write splitting: send read-only routes to replica databases.
+
+Configure replicas with ``DATABASE_REPLICA_URLS`` (comma separated). They are
+registered as Flask-SQLAlchemy binds ``replica0``, ``replica1``, ... and the
+session's ``get_bind`` sends statements there while a view decorated with
+``read_only`` (or a ``reading()`` block) runs. Everything else, and every ORM
+flush, goes to the primary.
+
+Falling back to the primary:
+
+* Read-your-writes: when a signed-in user's request commits, their session
+  cookie is pinned to the primary for ``REPLICA_STICKY_SECONDS``, so their
+  own bid or order is visible on the next page even if replicas are behind.
+* Lag: each replica's replay lag is checked at most every
+  ``REPLICA_LAG_CHECK_SECONDS``. Replicas more than ``REPLICA_MAX_LAG_SECONDS``
+  behind, or unreachable, are skipped until the next check.
+
+With no replicas configured the session behaves exactly as before. Two plain
+local databases work for trying it out; a non-standby Postgres or SQLite
+reports zero lag.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+import perf
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 2 * REPLICA_MAX_LAG_SECONDS))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 2))
+STICKY_SESSION_KEY = 'primary_until'
+
+log = logging.getLogger(__name__)
+
+# On a standby that has replayed everything it received, lag is 0 even if the primary is idle.
+# On a server that isn't a standby both LSNs are NULL, so it also reports 0.
+POSTGRES_LAG_QUERY = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+_lock = threading.Lock()
+_names = []
+_round_robin = itertools.count()
+_health = {}  # name -> {'lag': seconds or None, 'checked': monotonic, 'ok': bool}
+_routed = {}  # target (replica name or 'primary:<reason>') -> statements routed
+
+
+def init_app(app):
+    """Register replica binds from DATABASE_REPLICA_URLS. Call before db.init_app."""
+    global _names
+    urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    binds = {}
+    for i, url in enumerate(urls):
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        binds[f'replica{i}'] = url
+    app.config.setdefault('SQLALCHEMY_BINDS', {}).update(binds)
+    _names = list(binds)
+    perf.register_collector(render_prometheus)
+
+
+def read_only(f):
+    """Mark a view as read-only so its queries may be served by a replica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with reading():
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+@contextmanager
+def reading():
+    previous = g.get('read_only', False)
+    g.read_only = True
+    try:
+        yield
+    finally:
+        g.read_only = previous
+        g.pop('replica', None)
+
+
+def _count(target):
+    with _lock:
+        _routed[target] = _routed.get(target, 0) + 1
+
+
+def _measure_lag(engine):
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            return float(conn.execute(text(POSTGRES_LAG_QUERY)).scalar() or 0)
+        conn.execute(text('SELECT 1'))
+        return 0.0
+
+
+def _healthy(name, engine):
+    now = time.monotonic()
+    with _lock:
+        state = _health.get(name)
+        if state and now - state['checked'] < REPLICA_LAG_CHECK_SECONDS:
+            return state['ok']
+        # Claim this check so concurrent requests keep using the previous answer meanwhile.
+        _health[name] = dict(state or {'lag': None, 'ok': False}, checked=now)
+    try:
+        lag = _measure_lag(engine)
+        ok = lag <= REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        log.warning("Replica %s health check failed: %s", name, e)
+        lag, ok = None, False
+    with _lock:
+        _health[name] = {'lag': lag, 'checked': now, 'ok': ok}
+    return ok
+
+
+def _pick_replica():
+    """Engine to read from for this request, or None for the primary. Decided once per request."""
+    if 'replica' in g:
+        return g.replica
+    engine, reason = None, None
+    if not _names:
+        reason = 'no_replica'
+    elif has_request_context() and session.get(STICKY_SESSION_KEY, 0) > time.time():
+        reason = 'sticky'
+    else:
+        engines = current_app.extensions['sqlalchemy'].engines
+        start = next(_round_robin)
+        for i in range(len(_names)):
+            name = _names[(start + i) % len(_names)]
+            if _healthy(name, engines[name]):
+                engine, reason = engines[name], name
+                break
+        else:
+            reason = 'lagging'
+    g.replica = engine
+    g.replica_target = reason if engine is not None else f'primary:{reason}'
+    return engine
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads in ``read_only`` views to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('read_only'):
+            engine = _pick_replica()
+            _count(g.replica_target)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(db_session):
+    # Read-your-writes: the committing user reads from the primary for a while.
+    if _names and has_request_context() and session.get('user_id'):
+        session[STICKY_SESSION_KEY] = time.time() + REPLICA_STICKY_SECONDS
+
+
+def snapshot():
+    with _lock:
+        return {
+            'replicas': [{'name': name, 'lag_s': _health.get(name, {}).get('lag'),
+                          'ok': _health.get(name, {}).get('ok')} for name in _names],
+            'routed': sorted(_routed.items()),
+            'max_lag_s': REPLICA_MAX_LAG_SECONDS,
+        }
+
+
+def render_prometheus():
+    with _lock:
+        lines = ['# HELP db_read_routing_total Statements in read-only views, by where they were sent.',
+                 '# TYPE db_read_routing_total counter']
+        lines += [f'db_read_routing_total{{target="{perf.label(target)}"}} {count}' for target, count in sorted(_routed.items())]
+        lines += ['# HELP db_replica_lag_seconds Last measured replay lag per replica.',
+                  '# TYPE db_replica_lag_seconds gauge']
+        lines += [f'db_replica_lag_seconds{{replica="{name}"}} {state["lag"]}'
+                  for name, state in sorted(_health.items()) if state.get('lag') is not None]
+    return lines
@@ -1,9 +1,11 @@
-from app import app, db
-from models import User, Auction
+from app import create_app
+from models import db, User, Auction
+import stats
 from datetime import datetime, timedelta
 
 def create_sample_data():
     """Create sample auction data if database is empty."""
+    app = create_app(realtime_enabled=False)
     with app.app_context():
         # Check if auctions exist
         if db.session.query(Auction).count() == 0:
@@ -19,6 +21,7 @@ def create_sample_data():
                     created_at=datetime.now()
                 )
                 db.session.add(demo_user)
+                stats.bump('users')
                 db.session.commit()
                 print("👤 Demo user created.")
 
@@ -61,6 +64,7 @@ def create_sample_data():
             ]
 
             db.session.bulk_save_objects(sample_auctions)
+            stats.bump('auctions', len(sample_auctions))
             db.session.commit()
             print("✅ Sample data created.")
         else:
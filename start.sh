@@ -10,5 +10,9 @@ flask db upgrade
 # Seed the database with sample data (optional, safe to run multiple times)
 python seed.py
 
+# Build price-chart buckets for auctions whose bids predate them (no-op once built)
+python price_series.py
+
 echo "Starting Gunicorn server..."
+# The worker prefetches hot pages in the background (warmup.py); /readyz answers 503 until it is done.
 gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:$PORT "wsgi:application"
@@ -1,14 +1,186 @@
 document.addEventListener('DOMContentLoaded', function() {
     const bidForm = document.getElementById('bidForm');
-    const auctionId = bidForm ? bidForm.dataset.auctionId : null;
+    const bidList = document.getElementById('bidList');
+    const auctionId = bidList ? bidList.dataset.auctionId : null;
+
+    // --- Bid History: newest first, synced through /api/auction/<id>/bids cursors ---
+    // afterCursor is the newest bid shown, beforeCursor the oldest.
+    let afterCursor = bidList ? bidList.dataset.after || null : null;
+    let beforeCursor = bidList ? bidList.dataset.before || null : null;
+    let hasOlder = bidList ? bidList.dataset.hasOlder === 'true' : false;
+    let loadingOlder = false;
+    const seenCursors = new Set();
+    if (bidList) {
+        bidList.querySelectorAll('.bid-item').forEach(function(item) {
+            seenCursors.add(item.dataset.cursor);
+        });
+    }
+
+    function bidsUrl(params) {
+        return `/api/auction/${auctionId}/bids?` + new URLSearchParams(params).toString();
+    }
+
+    function renderBid(bid) {
+        const item = document.createElement('div');
+        item.className = 'bid-item';
+        if (bid.cursor) {
+            item.dataset.cursor = bid.cursor;
+        }
+        // Format time to be more readable
+        const bidTime = new Date(bid.bid_time).toLocaleString([], { dateStyle: 'short', timeStyle: 'short' });
+        item.innerHTML = `
+            <span class="bidder">${escapeHTML(bid.bidder_name)}</span>
+            <span class="bid-amount">₹${parseFloat(bid.bid_amount).toFixed(2)}</span>
+            <span class="bid-time">${bidTime}</span>
+        `;
+        return item;
+    }
+
+    // Bids newer than everything shown, oldest first. Skips ones already on screen.
+    function addNewerBids(bids) {
+        if (!bidList || !bids.length) {
+            return;
+        }
+        // If "No bids yet" message exists, remove it.
+        const noBidsMessage = bidList.querySelector('.no-bids-message');
+        if (noBidsMessage) {
+            noBidsMessage.remove();
+        }
+        bids.forEach(function(bid) {
+            if (bid.cursor && seenCursors.has(bid.cursor)) {
+                return;
+            }
+            if (bid.cursor) {
+                seenCursors.add(bid.cursor);
+                afterCursor = bid.cursor;
+                beforeCursor = beforeCursor || bid.cursor;
+            }
+            bidList.prepend(renderBid(bid));
+        });
+    }
+
+    // Fetch whatever was missed while the socket was down.
+    async function catchUp() {
+        // With nothing shown yet, the newest page is enough; anything older is left to scrolling.
+        const fromScratch = afterCursor === null;
+        let hasMore = true;
+        while (hasMore) {
+            const response = await fetch(bidsUrl(fromScratch ? { limit: 50 } : { after: afterCursor, limit: 50 }));
+            if (!response.ok) {
+                return;
+            }
+            const page = await response.json();
+            addNewerBids(page.bids.slice().reverse());
+            if (fromScratch) {
+                hasOlder = page.has_more;
+            }
+            hasMore = !fromScratch && page.has_more && page.bids.length > 0;
+        }
+    }
+
+    async function loadOlderBids() {
+        if (loadingOlder || !hasOlder || !beforeCursor) {
+            return;
+        }
+        loadingOlder = true;
+        try {
+            const response = await fetch(bidsUrl({ before: beforeCursor }));
+            if (!response.ok) {
+                return;
+            }
+            const page = await response.json();
+            page.bids.forEach(function(bid) {
+                if (!seenCursors.has(bid.cursor)) {
+                    seenCursors.add(bid.cursor);
+                    bidList.insertBefore(renderBid(bid), sentinel);
+                }
+            });
+            beforeCursor = page.before;
+            hasOlder = page.has_more;
+        } catch (error) {
+            console.error('Error loading older bids:', error);
+        } finally {
+            loadingOlder = false;
+        }
+    }
+
+    // Infinite scroll: load the next older page when the end of the list scrolls into view.
+    let sentinel = null;
+    if (bidList && 'IntersectionObserver' in window) {
+        sentinel = document.createElement('div');
+        sentinel.className = 'bid-list-sentinel';
+        bidList.appendChild(sentinel);
+        const observer = new IntersectionObserver(function(entries) {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadOlderBids();
+            }
+        }, { root: bidList, rootMargin: '100px' });
+        observer.observe(sentinel);
+    }
+
+    // --- Price Chart: OHLC buckets from /api/auction/<id>/price-series ---
+    const priceChart = document.getElementById('priceChart');
+    let chartRefresh = null;
+
+    async function drawPriceChart() {
+        if (!priceChart) {
+            return;
+        }
+        try {
+            const response = await fetch(`/api/auction/${priceChart.dataset.auctionId}/price-series`);
+            if (!response.ok) {
+                return;
+            }
+            const series = await response.json();
+            if (series.t.length < 2) {
+                priceChart.innerHTML = '';
+                return;
+            }
+            const width = 300, height = 120, pad = 6;
+            const tMax = series.t[series.t.length - 1];
+            const low = Math.min(...series.l), high = Math.max(...series.h);
+            const x = t => pad + (width - 2 * pad) * t / tMax;
+            const y = v => height - pad - (height - 2 * pad) * (high === low ? 0.5 : (v - low) / (high - low));
+            const ranges = series.t.map((t, i) =>
+                `<line class="range" x1="${x(t)}" x2="${x(t)}" y1="${y(series.l[i])}" y2="${y(series.h[i])}"></line>`).join('');
+            const closes = series.t.map((t, i) => `${x(t)},${y(series.c[i])}`).join(' ');
+            priceChart.innerHTML = `
+                <svg viewBox="0 0 ${width} ${height}" preserveAspectRatio="none" role="img"
+                     aria-label="Price history, one point per ${series.resolution}">
+                    ${ranges}<polyline class="close" points="${closes}"></polyline>
+                </svg>
+            `;
+        } catch (error) {
+            console.error('Error loading price chart:', error);
+        }
+    }
+
+    // Redraw at most once a second while bids are streaming in.
+    function schedulePriceChart() {
+        if (!chartRefresh) {
+            chartRefresh = setTimeout(function() {
+                chartRefresh = null;
+                drawPriceChart();
+            }, 1000);
+        }
+    }
+
+    drawPriceChart();
 
     // --- Socket.IO Setup for Real-Time Updates ---
     if (auctionId) {
         const socket = io.connect(location.protocol + '//' + document.domain + ':' + location.port);
+        let connectedBefore = false;
 
         socket.on('connect', function() {
             console.log('Socket connected, joining auction room:', auctionId);
             socket.emit('join_auction', { auction_id: auctionId });
+            // Bids placed while disconnected were broadcast to nobody on this page.
+            if (connectedBefore) {
+                catchUp();
+                schedulePriceChart();
+            }
+            connectedBefore = true;
         });
 
         socket.on('bid_update', function(data) {
@@ -19,36 +191,21 @@ document.addEventListener('DOMContentLoaded', function() {
                 currentPriceEl.textContent = `₹${parseFloat(data.new_price).toFixed(2)}`;
             }
 
-            // Update minimum bid amount on the form
+            // Update minimum bid amount on the forms
+            ['bidAmount', 'maxBidAmount'].forEach(function(id) {
+                const input = document.getElementById(id);
+                if (input) {
+                    input.min = parseFloat(data.new_price) + 0.01;
+                }
+            });
             const bidAmountInput = document.getElementById('bidAmount');
             if (bidAmountInput) {
-                bidAmountInput.min = parseFloat(data.new_price) + 0.01;
                 bidAmountInput.placeholder = `Enter bid > ₹${parseFloat(data.new_price).toFixed(2)}`;
             }
 
-            // Add the new bid to the top of the history list
-            const bidList = document.getElementById('bidList');
-            if (bidList) {
-                const newBidItem = document.createElement('div');
-                newBidItem.className = 'bid-item';
-
-                // Format time to be more readable
-                const bidTime = new Date(data.bid_time).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-
-                newBidItem.innerHTML = `
-                    <span class="bidder">${escapeHTML(data.bidder_name)}</span>
-                    <span class="bid-amount">₹${parseFloat(data.bid_amount).toFixed(2)}</span>
-                    <span class="bid-time">${bidTime}</span>
-                `;
-
-                // If "No bids yet" message exists, remove it.
-                const noBidsMessage = bidList.querySelector('.no-bids-message');
-                if (noBidsMessage) {
-                    noBidsMessage.remove();
-                }
-
-                bidList.prepend(newBidItem);
-            }
+            // A resolved proxy-bid war arrives as one update carrying every bid it wrote, oldest first.
+            addNewerBids(data.bids || [data]);
+            schedulePriceChart();
         });
     }
     
@@ -107,7 +264,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 const result = await response.json();
                 
                 if (result.success) {
-                    showAlert('Bid placed successfully! The page will update.', 'success');
+                    showAlert(result.leading ? 'Bid placed successfully! The page will update.' : result.message,
+                              result.leading ? 'success' : 'error');
                     // Clear the input field
                     bidAmountInput.value = '';
                     // The UI will now be updated by the 'bid_update' socket event for all users,
@@ -124,4 +282,50 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     }
-});
\ No newline at end of file
+
+    // --- Maximum (proxy) bid ---
+    const proxyBidForm = document.getElementById('proxyBidForm');
+    if (proxyBidForm) {
+        proxyBidForm.addEventListener('submit', async function(e) {
+            e.preventDefault();
+
+            const maxBidInput = document.getElementById('maxBidAmount');
+            const maxAmount = maxBidInput.value;
+            const submitButton = this.querySelector('button[type="submit"]');
+
+            if (!maxAmount || parseFloat(maxAmount) <= 0) {
+                showAlert('Please enter a valid maximum bid', 'error');
+                return;
+            }
+
+            submitButton.disabled = true;
+
+            try {
+                const response = await fetch('/api/proxy_bid', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        auction_id: parseInt(auctionId),
+                        max_amount: parseFloat(maxAmount)
+                    })
+                });
+
+                const result = await response.json();
+
+                if (result.success) {
+                    showAlert(result.message, result.leading ? 'success' : 'error');
+                    document.getElementById('maxBidNote').textContent =
+                        `Your maximum: ₹${parseFloat(maxAmount).toFixed(2)}. We bid for you up to this amount.`;
+                    maxBidInput.value = '';
+                } else {
+                    showAlert(result.message, 'error');
+                }
+            } catch (error) {
+                console.error('Error setting maximum bid:', error);
+                showAlert('An error occurred. Please try again.', 'error');
+            } finally {
+                submitButton.disabled = false;
+            }
+        });
+    }
+});
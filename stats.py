@@ -0,0 +1,143 @@
+"""Maintained counters and cached aggregates for the admin dashboard.
+
+Totals (users, auctions, orders, GMV, orders per status) live as rows in
+``stat_counters`` and are bumped in the same transaction as the write they
+count, so reading them is a primary-key lookup instead of a COUNT(*) scan.
+The slower aggregates (bids in the last hour, active auctions per category)
+are refreshed by a background task and served from the cache.
+"""
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta
+
+from models import db, ORDER_STATUSES
+import queries
+import realtime
+import replicas
+
+log = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = 'admin_stats'
+STATS_REFRESH_SECONDS = int(os.getenv('STATS_REFRESH_SECONDS', 30))
+
+# How each counter is rebuilt from scratch when its row is missing.
+_SEED_QUERIES = {
+    'users': (queries.COUNT_USERS, {}),
+    'auctions': (queries.COUNT_AUCTIONS, {}),
+    'orders': (queries.COUNT_ORDERS, {}),
+    'gmv': (queries.ORDERS_GMV, {}),
+}
+for _status in ORDER_STATUSES:
+    _SEED_QUERIES[f'orders_status:{_status}'] = (queries.COUNT_ORDERS_WITH_STATUS, {'status': _status})
+
+
+def _exact(name):
+    query, params = _SEED_QUERIES[name]
+    return query.scalar(**params) or 0
+
+
+def bump(name, delta=1):
+    """Adjust a counter. Runs inside the caller's transaction, after the write it counts; the caller commits.
+
+    A missing row is created from an exact count, which already includes the caller's write.
+    """
+    if queries.BUMP_COUNTER.execute(delta=delta, name=name).rowcount:
+        return
+    db.session.flush()  # pending ORM inserts must be in the count
+    if not queries.SEED_COUNTER.execute(name=name, value=_exact(name)).rowcount:
+        # Another transaction created the row first, from a count that can't include our write.
+        queries.BUMP_COUNTER.execute(delta=delta, name=name)
+
+
+def ensure_counters():
+    """Create any missing counter rows, seeding them with an exact count once."""
+    existing = {row.name for row in queries.COUNTER_NAMES.all()}
+    missing = [name for name in _SEED_QUERIES if name not in existing]
+    for name in missing:
+        queries.SEED_COUNTER.execute(name=name, value=_exact(name))
+    if missing:
+        db.session.commit()
+
+
+def read_counters():
+    """Return all counters as a dict; counts are ints, GMV stays a float."""
+    return {name: (float(value) if name == 'gmv' else int(value)) for name, value in queries.ALL_COUNTERS.all()}
+
+
+class _BidRateWindow:
+    """Rolling one-hour bid count fed incrementally from the bids primary key."""
+
+    def __init__(self, window=timedelta(hours=1)):
+        self.window = window
+        self.buckets = deque()  # (sampled_at, bids since previous sample)
+        self.last_bid_id = None
+
+    def refresh(self, now):
+        if self.last_bid_id is None:
+            # First pass: count the last hour once, then only look at new ids.
+            row = queries.BIDS_SINCE.first(since=now - self.window)
+            self.last_bid_id = row[1] or queries.MAX_BID_ID.scalar()
+        else:
+            row = queries.BIDS_AFTER_ID.first(last_id=self.last_bid_id)
+            if row[1] is not None:
+                self.last_bid_id = row[1]
+        self.buckets.append((now, row[0]))
+        while self.buckets and self.buckets[0][0] <= now - self.window:
+            self.buckets.popleft()
+        return sum(count for _, count in self.buckets)
+
+
+def _counter_fields(counters):
+    return {
+        'user_count': counters.get('users', 0),
+        'auction_count': counters.get('auctions', 0),
+        'order_count': counters.get('orders', 0),
+        'gmv': counters.get('gmv', 0.0),
+        'orders_by_status': {status: counters.get(f'orders_status:{status}', 0) for status in ORDER_STATUSES},
+    }
+
+
+def compute_snapshot(bid_window):
+    """Build the dashboard payload from counters plus the background aggregates."""
+    now = datetime.now()
+    snapshot = _counter_fields(read_counters())
+    by_category = queries.ACTIVE_AUCTIONS_BY_CATEGORY.all(now=now)
+    snapshot.update({
+        'bids_last_hour': bid_window.refresh(now),
+        'active_by_category': {category: count for category, count in by_category},
+        'refreshed_at': now.isoformat(timespec='seconds'),
+    })
+    return snapshot
+
+
+def get_snapshot(cache):
+    """Dashboard stats from the cache, falling back to the counter rows alone."""
+    snapshot = cache.get(STATS_CACHE_KEY)
+    if snapshot is not None:
+        return snapshot
+    snapshot = _counter_fields(read_counters())
+    snapshot.update({'bids_last_hour': None, 'active_by_category': {}, 'refreshed_at': None})
+    return snapshot
+
+
+def _refresh_loop(app, cache, interval):
+    bid_window = _BidRateWindow()
+    with app.app_context():
+        while True:
+            try:
+                ensure_counters()
+                with replicas.reading():
+                    snapshot = compute_snapshot(bid_window)
+                cache.set(STATS_CACHE_KEY, snapshot, timeout=interval * 10)
+            except Exception:
+                db.session.rollback()
+                log.exception("Error refreshing admin stats")
+            finally:
+                db.session.remove()
+            realtime.sleep(interval)
+
+
+def start_refresher(app, cache, interval=STATS_REFRESH_SECONDS):
+    """Launch the background task that keeps the cached dashboard stats fresh."""
+    return realtime.start_background_task(_refresh_loop, app, cache, interval)
@@ -0,0 +1,122 @@
+"""In-process TTL/LRU cache of per-user attributes used on hot paths.
+
+Bidding needs ``email_verified``, admin pages need ``is_admin`` and the
+profile pages need name/email. They all read the same users row, so it's
+fetched once and kept here keyed by user id. Routes that change those
+columns call ``invalidate`` after committing, so a verification or an admin
+demotion takes effect on the next request. ``USER_CACHE_TTL`` bounds how
+stale an entry can get if the row is changed some other way (another
+process, a manual SQL fix). Each invalidation also bumps the user's
+generation, and a row read before the bump is not stored after it, so a
+slow miss can't put back what ``invalidate`` just dropped. Bid history gets
+bidder names from here too (``names``) instead of joining users.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import perf
+import queries
+from models import db
+
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # user_id -> (expires_at, attrs), least recently used first
+_generations = {}  # user_id -> invalidations so far; users never invalidated are absent (generation 0)
+_hits = 0
+_misses = 0
+_invalidations = 0
+
+
+def get(user_id):
+    """Attributes of ``user_id`` (name, email, created_at, email_verified, is_admin) or None."""
+    global _hits, _misses
+    if user_id is None:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry and entry[0] > now:
+            _entries.move_to_end(user_id)
+            _hits += 1
+            return entry[1]
+        _misses += 1
+        generation = _generations.get(user_id, 0)
+
+    # Always from the primary: a lagging replica could re-cache what invalidate() just dropped.
+    row = queries.USER_ATTRIBUTES.first(bind=db.engine, user_id=user_id)
+    attrs = row._asdict() if row else None
+    if attrs is not None:
+        with _lock:
+            if _generations.get(user_id, 0) != generation:
+                return attrs  # invalidated while we read; the row may predate the change
+            _entries[user_id] = (now + USER_CACHE_TTL, attrs)
+            _entries.move_to_end(user_id)
+            while len(_entries) > USER_CACHE_SIZE:
+                _entries.popitem(last=False)
+    return attrs
+
+
+def names(user_ids):
+    """Display names for ``user_ids`` as a dict. Cache misses are fetched in a single query."""
+    global _hits, _misses
+    found, missing = {}, {}
+    now = time.monotonic()
+    with _lock:
+        for user_id in set(user_ids):
+            entry = _entries.get(user_id)
+            if entry and entry[0] > now:
+                _entries.move_to_end(user_id)
+                found[user_id] = entry[1]['name']
+                _hits += 1
+            else:
+                missing[user_id] = _generations.get(user_id, 0)
+                _misses += 1
+    if missing:
+        rows = queries.USERS_ATTRIBUTES.all(bind=db.engine, user_ids=sorted(missing))
+        with _lock:
+            for row in rows:
+                attrs = row._asdict()
+                user_id = attrs.pop('id')
+                found[user_id] = attrs['name']
+                if _generations.get(user_id, 0) != missing[user_id]:
+                    continue
+                _entries[user_id] = (now + USER_CACHE_TTL, attrs)
+                _entries.move_to_end(user_id)
+            while len(_entries) > USER_CACHE_SIZE:
+                _entries.popitem(last=False)
+    return found
+
+
+def invalidate(user_id):
+    """Drop ``user_id`` so the next read sees the committed row."""
+    global _invalidations
+    with _lock:
+        _entries.pop(user_id, None)
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _invalidations += 1
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def render_prometheus():
+    with _lock:
+        return ['# HELP user_cache_requests_total User attribute lookups by result.',
+                '# TYPE user_cache_requests_total counter',
+                f'user_cache_requests_total{{result="hit"}} {_hits}',
+                f'user_cache_requests_total{{result="miss"}} {_misses}',
+                '# HELP user_cache_invalidations_total Entries dropped after a user row changed.',
+                '# TYPE user_cache_invalidations_total counter',
+                f'user_cache_invalidations_total {_invalidations}',
+                '# HELP user_cache_entries Users currently cached.',
+                '# TYPE user_cache_entries gauge',
+                f'user_cache_entries {len(_entries)}']
+
+
+perf.register_collector(render_prometheus)
@@ -0,0 +1 @@
+"""Route blueprints; app.create_app registers them. Socket.IO handlers live in sockets.py."""
@@ -0,0 +1,206 @@
+"""The signed-in user's dashboard, profile, email verification and notifications."""
+import logging
+import random
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+
+from helpers import current_user
+from models import db
+import queries
+import replicas
+import user_cache
+
+bp = Blueprint('account', __name__)
+log = logging.getLogger(__name__)
+
+
+@bp.route('/dashboard')
+@replicas.read_only
+def dashboard():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+
+    # This route now only fetches the FIRST page of the default tab ("My Bids")
+    # to ensure the initial page load is extremely fast.
+    try:
+        page_size = 10  # Define a page size
+
+        # Fetch one extra item to check if there are more pages
+        my_bids = queries.MY_BIDS.all(user_id=session['user_id'], limit=page_size + 1, offset=0)
+
+        has_more_bids = len(my_bids) > page_size
+        my_bids = my_bids[:page_size]
+
+        return render_template('dashboard.html', my_bids=my_bids, has_more_bids=has_more_bids)
+    except Exception as e:
+        log.exception("Error in dashboard route")
+        return render_template('error.html', message="A database error occurred."), 500
+
+@bp.route('/api/dashboard_content')
+@replicas.read_only
+def get_dashboard_content():
+    """API endpoint to fetch paginated content for any dashboard tab."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    tab = request.args.get('tab')
+    page = request.args.get('page', 1, type=int)
+    page_size = 10
+    offset = (page - 1) * page_size
+
+    try:
+        user_id = session['user_id']
+
+        if tab == 'my-bids':
+            query, template_name, template_context_key = queries.MY_BIDS, 'partials/_my_bids.html', 'my_bids'
+        elif tab == 'my-auctions':
+            query, template_name, template_context_key = queries.MY_AUCTIONS, 'partials/_my_auctions.html', 'my_auctions'
+        elif tab == 'my-orders':
+            query, template_name, template_context_key = queries.MY_ORDERS, 'partials/_my_orders.html', 'my_orders'
+        else:
+            return jsonify({'error': 'Invalid tab'}), 400
+
+        items = query.all(user_id=user_id, limit=page_size + 1, offset=offset)
+
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        log.debug("Dashboard content", extra={'tab': tab, 'page': page, 'items': len(items)})
+
+        html = render_template(template_name, **{template_context_key: items})
+        return jsonify({'html': html, 'has_more': has_more})
+    except Exception as e:
+        # This makes debugging easier by logging the actual error to the server log.
+        log.exception("Error in /api/dashboard_content", extra={'tab': tab})
+        # Return a specific error message to the client.
+        return jsonify({'error': f'An error occurred while loading content for {tab}.'}), 500
+
+@bp.route('/profile')
+@replicas.read_only
+def profile():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+    user = current_user()
+    if not user:
+        return "User not found", 404
+    return render_template('profile.html', user=user)
+
+@bp.route('/profile/edit', methods=['GET', 'POST'])
+def edit_profile():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+
+    if request.method == 'POST':
+        try:
+            name = request.form.get('name')
+            email = request.form.get('email')
+            otp = request.form.get('otp')
+
+            user = current_user()
+
+            if not name or not email:
+                return render_template('edit-profile.html', user=user, error='All fields are required.')
+
+            if email != user['email']:
+                if 'email_change_otp' not in session or session.get('email_change_new') != email:
+                    return render_template('edit-profile.html', user=user, error='Please request OTP for your new email before changing.')
+                if not otp or str(otp) != str(session['email_change_otp']):
+                    return render_template('edit-profile.html', user=user, error='Invalid OTP for email change.')
+
+                if queries.EMAIL_TAKEN.first(email=email, user_id=session['user_id']):
+                    return render_template('edit-profile.html', user=user, error='Email already in use.')
+
+                queries.UPDATE_USER_NAME_EMAIL.execute(name=name, email=email, user_id=session['user_id'])
+                session.pop('email_change_otp', None)
+                session.pop('email_change_new', None)
+            else:
+                queries.UPDATE_USER_NAME.execute(name=name, user_id=session['user_id'])
+
+            db.session.commit()
+            user_cache.invalidate(session['user_id'])
+            session['user_name'] = name
+            return redirect(url_for('account.profile'))
+        except Exception as e:
+            db.session.rollback()
+            log.exception("Error editing profile")
+            user = current_user()
+            return render_template('edit-profile.html', user=user, error='An error occurred while saving.')
+    else:
+        user = current_user()
+        return render_template('edit-profile.html', user=user)
+
+@bp.route('/profile/request-email-change-otp', methods=['POST'])
+def request_email_change_otp():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+    new_email = request.form.get('new_email')
+    if not new_email:
+        return redirect(url_for('account.edit_profile'))
+    # Generate OTP and store in session
+    otp = random.randint(100000, 999999)
+    session['email_change_otp'] = otp
+    session['email_change_new'] = new_email
+    log.info("[DEMO] OTP for changing email to %s: %s", new_email, otp)
+    return redirect(url_for('account.edit_profile'))
+
+@bp.route('/users')
+@replicas.read_only
+def list_users():
+    users = queries.USER_DIRECTORY.all()
+    return render_template('users.html', users=users)
+
+@bp.route('/profile/request-verify', methods=['POST'])
+def request_email_verification():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+    # Generate a 6-digit OTP
+    otp = random.randint(100000, 999999)
+    session['otp'] = otp
+    session['otp_user_id'] = session['user_id']
+    log.info("[DEMO] OTP for user %s: %s", session['user_id'], otp)  # In real app, send via email
+    return redirect(url_for('account.verify_otp'))
+
+@bp.route('/profile/verify-otp', methods=['GET', 'POST'])
+def verify_otp():
+    if 'user_id' not in session or 'otp' not in session or session.get('otp_user_id') != session['user_id']:
+        return redirect(url_for('account.profile'))
+    error = None
+    if request.method == 'POST':
+        entered_otp = request.form.get('otp')
+        if entered_otp and str(entered_otp) == str(session['otp']):
+            queries.SET_EMAIL_VERIFIED.execute(verified=True, user_id=session['user_id'])
+            db.session.commit()
+            user_cache.invalidate(session['user_id'])
+
+            session.pop('otp', None)
+            session.pop('otp_user_id', None)
+            return redirect(url_for('account.profile'))
+        else:
+            error = 'Invalid OTP. Please try again.'
+    return render_template('verify-otp.html', error=error)
+
+@bp.route('/api/notifications/mark-read', methods=['POST'])
+def mark_notifications_as_read():
+    if 'user_id' not in session:
+        return jsonify({'success': False}), 401
+    queries.MARK_NOTIFICATIONS_READ.execute(is_read=True, user_id=session['user_id'])
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/api/notifications/summary')
+@replicas.read_only
+def notifications_summary():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not logged in'}), 401
+
+    unread_count = queries.UNREAD_NOTIFICATION_COUNT.scalar(user_id=session['user_id'], is_read=False)
+
+    # Rows are tuples (jsonify would send lists), so send dicts.
+    notifications = [row._asdict() for row in queries.RECENT_NOTIFICATIONS.all(user_id=session['user_id'])]
+
+    # Ensure datetime objects are JSON serializable
+    for notification in notifications:
+        if isinstance(notification.get('created_at'), datetime):
+            notification['created_at'] = notification['created_at'].isoformat()
+
+    return jsonify({'success': True, 'unread_count': unread_count, 'notifications': notifications})
@@ -0,0 +1,164 @@
+"""Admin panel: overview stats, performance metrics, users, auctions and orders."""
+import hmac
+import logging
+import os
+
+from flask import Blueprint, render_template, request, session, redirect, url_for, Response, jsonify, flash
+
+from extensions import cache
+from helpers import admin_required, current_user
+from models import db, ORDER_STATUSES
+import bulk
+import feeds
+import logs
+import maintenance
+import passwords
+import perf
+import queries
+import ratelimit
+import realtime
+import replicas
+import stats
+import user_cache
+import warmup
+
+bp = Blueprint('admin', __name__)
+log = logging.getLogger(__name__)
+
+
+@bp.route('/admin')
+@admin_required
+@replicas.read_only
+def admin_dashboard():
+    # Counters are maintained on write and aggregates refreshed in the background,
+    # so this page costs the same no matter how large the tables get.
+    return render_template('admin/dashboard.html', **stats.get_snapshot(cache))
+
+@bp.route('/admin/perf')
+@admin_required
+def admin_perf():
+    return render_template('admin/perf.html', perf=perf.snapshot(), realtime=realtime.snapshot(),
+                           passwords=passwords.snapshot(), ratelimit=ratelimit.snapshot(),
+                           replicas=replicas.snapshot(), statements=queries.snapshot(),
+                           logs=logs.snapshot(), feeds=feeds.snapshot(),
+                           maintenance=maintenance.snapshot(), warmup=warmup.snapshot())
+
+@bp.route('/admin/perf/metrics')
+def admin_perf_metrics():
+    # Scrapers can't log in, so also accept the token configured in PERF_METRICS_TOKEN.
+    token = os.getenv('PERF_METRICS_TOKEN')
+    user = current_user()
+    if not (user and user['is_admin']) and not (token and hmac.compare_digest(request.args.get('token', ''), token)):
+        return "Forbidden", 403
+    return Response(perf.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/perf/reset', methods=['POST'])
+@admin_required
+def admin_perf_reset():
+    perf.reset()
+    return redirect(url_for('admin.admin_perf'))
+
+@bp.route('/admin/users')
+@admin_required
+@replicas.read_only
+def admin_users():
+    users = queries.ADMIN_USERS.all()
+    return render_template('admin/users.html', users=users)
+
+@bp.route('/admin/user/<int:user_id>/toggle-admin', methods=['POST'])
+@admin_required
+def toggle_admin_status(user_id):
+    # Prevent an admin from demoting themselves to avoid getting locked out
+    if user_id == session.get('user_id'):
+        return redirect(url_for('admin.admin_users'))
+
+    user = queries.USER_IS_ADMIN.first(user_id=user_id)
+    if user:
+        new_status = not user.is_admin
+        queries.SET_USER_ADMIN.execute(status=new_status, user_id=user_id)
+        db.session.commit()
+        user_cache.invalidate(user_id)
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/auctions')
+@admin_required
+@replicas.read_only
+def admin_auctions():
+    auctions = queries.ADMIN_AUCTIONS.all()
+    return render_template('admin/auctions.html', auctions=auctions)
+
+@bp.route('/admin/auction/<int:auction_id>/delete', methods=['POST'])
+@admin_required
+def delete_auction(auction_id):
+    try:
+        _, skipped = bulk.delete_auctions([auction_id])
+        if skipped:
+            flash(f"Auction #{auction_id} has an order and was not deleted.")
+    except Exception as e:
+        db.session.rollback()
+        log.exception("Error deleting auction")
+    return redirect(url_for('admin.admin_auctions'))
+
+@bp.route('/admin/auctions/bulk-delete', methods=['POST'])
+@admin_required
+def bulk_delete_auctions():
+    auction_ids = request.form.getlist('auction_ids', type=int)
+    try:
+        job_id, result = bulk.run(f"Deleting {len(auction_ids)} auctions", bulk.delete_auctions, auction_ids)
+    except Exception as e:
+        db.session.rollback()
+        log.exception("Error deleting auctions")
+        return redirect(url_for('admin.admin_auctions'))
+    if job_id:
+        return redirect(url_for('admin.admin_auctions', job=job_id))
+    deleted, skipped = result
+    flash(f"Deleted {deleted} auction(s).")
+    if skipped:
+        flash(f"Skipped {len(skipped)} auction(s) with orders: {', '.join(f'#{i}' for i in skipped)}.")
+    return redirect(url_for('admin.admin_auctions'))
+
+@bp.route('/admin/orders')
+@admin_required
+@replicas.read_only
+def admin_orders():
+    orders = queries.ADMIN_ORDERS.all()
+    return render_template('admin/orders.html', orders=orders, statuses=ORDER_STATUSES)
+
+@bp.route('/admin/order/<int:order_id>/update_status', methods=['POST'])
+@admin_required
+def update_order_status(order_id):
+    new_status = request.form.get('status')
+    if new_status in ORDER_STATUSES:
+        try:
+            bulk.update_order_status([order_id], new_status)
+        except Exception:
+            db.session.rollback()
+            log.exception("Error updating order status")
+    return redirect(url_for('admin.admin_orders'))
+
+@bp.route('/admin/orders/bulk-status', methods=['POST'])
+@admin_required
+def bulk_update_order_status():
+    new_status = request.form.get('status')
+    order_ids = request.form.getlist('order_ids', type=int)
+    if new_status not in ORDER_STATUSES:
+        return redirect(url_for('admin.admin_orders'))
+    try:
+        job_id, result = bulk.run(f"Moving {len(order_ids)} orders to {new_status}", bulk.update_order_status,
+                                  order_ids, new_status)
+    except Exception:
+        db.session.rollback()
+        log.exception("Error updating order statuses")
+        return redirect(url_for('admin.admin_orders'))
+    if job_id:
+        return redirect(url_for('admin.admin_orders', job=job_id))
+    flash(f"Updated {result[0]} order(s) to {new_status}.")
+    return redirect(url_for('admin.admin_orders'))
+
+@bp.route('/admin/jobs/<int:job_id>')
+@admin_required
+def admin_job(job_id):
+    job = bulk.job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
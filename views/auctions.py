@@ -0,0 +1,386 @@
+"""Auction browsing, creation and editing, bidding and checkout."""
+import logging
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, current_app, send_from_directory
+from werkzeug.utils import secure_filename
+
+from extensions import cache
+from helpers import UPLOAD_FOLDER, allowed_file, current_user, get_delivery_date
+from models import db, Auction
+import bidding
+import feeds
+import price_series
+import queries
+import ratelimit
+import replicas
+import stats
+
+bp = Blueprint('auctions', __name__)
+log = logging.getLogger(__name__)
+
+BID_PAGE_SIZE = 10
+MAX_BID_PAGE_SIZE = 100
+
+
+@cache.memoize(timeout=60)
+def _active_listing(category):
+    """Active auctions for the home page, shared by every visitor for 60s."""
+    # Pass the datetime object directly, letting the driver handle formatting. This is more robust.
+    if category:
+        rows = queries.ACTIVE_AUCTIONS_IN_CATEGORY.all(now=datetime.now(), category=category)
+    else:
+        rows = queries.ACTIVE_AUCTIONS.all(now=datetime.now())
+    return [row._asdict() for row in rows]
+
+@bp.route('/')
+# Cached per category for 60s, for signed-out visitors only: the page carries the visitor's nav and socket room.
+@cache.cached(timeout=60, query_string=True, unless=lambda: 'user_id' in session)
+@replicas.read_only
+def index():
+    category = request.args.get('category')
+    try:
+        auctions = _active_listing(category or None)
+        ending_soon = hot = []
+        if not category:
+            ending_soon, hot = feeds.ending_soon(), feeds.hot()
+
+        return render_template('index.html', auctions=auctions, ending_soon=ending_soon, hot=hot)
+    except Exception as e:
+        log.exception("Database error in index route")
+        return render_template('error.html', message="A database error occurred."), 500
+
+@bp.route('/auction/<int:auction_id>')
+@replicas.read_only
+def auction_detail(auction_id):
+    try:
+        # Get auction details
+        auction = queries.AUCTION.first(auction_id=auction_id)
+
+        if not auction:
+            return "Auction not found", 404
+
+        # Get bid history; older pages are fetched from /api/auction/<id>/bids as the list scrolls
+        rows = queries.LATEST_BIDS.all(auction_id=auction_id, limit=BID_PAGE_SIZE + 1)
+        bids = bidding.history(rows[:BID_PAGE_SIZE])
+        has_older_bids = len(rows) > BID_PAGE_SIZE
+
+        # Set once maintenance has archived all but each bidder's highest bid.
+        bid_summary = queries.BID_SUMMARY.first(auction_id=auction_id) if auction.end_time < datetime.now() else None
+
+        my_max_bid = None
+        if 'user_id' in session:
+            my_max_bid = queries.MY_PROXY_BID.first(auction_id=auction_id, user_id=session['user_id'])
+
+        return render_template('auction-detail.html', auction=auction, bids=bids, has_older_bids=has_older_bids,
+                               my_max_bid=my_max_bid, bid_summary=bid_summary)
+    except Exception as e:
+        log.exception("Error in auction_detail route")
+        return render_template('error.html', message="A database error occurred."), 500
+
+@bp.route('/api/auction/<int:auction_id>/bids')
+@replicas.read_only
+def auction_bids(auction_id):
+    """A page of bid history, newest first.
+
+    ``?before=<cursor>`` pages back from the oldest bid the client has;
+    ``?after=<cursor>`` returns bids newer than the newest one it has (oldest
+    of those first if there are more than ``limit``, so repeating with the
+    returned ``after`` catches up). ``has_more`` says whether another page
+    exists in that direction.
+    """
+    limit = max(1, min(request.args.get('limit', BID_PAGE_SIZE, type=int), MAX_BID_PAGE_SIZE))
+    try:
+        if 'after' in request.args:
+            bid_time, bid_id = bidding.parse_cursor(request.args['after'])
+            rows = queries.BIDS_AFTER.all(auction_id=auction_id, bid_time=bid_time, bid_id=bid_id, limit=limit + 1)
+            has_more = len(rows) > limit
+            rows = rows[:limit][::-1]
+        elif 'before' in request.args:
+            bid_time, bid_id = bidding.parse_cursor(request.args['before'])
+            rows = queries.BIDS_BEFORE.all(auction_id=auction_id, bid_time=bid_time, bid_id=bid_id, limit=limit + 1)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = queries.LATEST_BIDS.all(auction_id=auction_id, limit=limit + 1)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    bids = bidding.history(rows)
+    return jsonify({
+        'bids': bids,
+        'has_more': has_more,
+        'after': bids[0]['cursor'] if bids else request.args.get('after'),
+        'before': bids[-1]['cursor'] if bids else request.args.get('before'),
+    })
+
+@bp.route('/api/auction/<int:auction_id>/price-series')
+@replicas.read_only
+def auction_price_series(auction_id):
+    """OHLC buckets for the price chart; ``?resolution=`` minute, hour, day or auto (default)."""
+    resolution = request.args.get('resolution', 'auto')
+    if resolution != 'auto' and resolution not in price_series.RESOLUTIONS:
+        return jsonify({'error': 'Unknown resolution'}), 400
+    return jsonify(price_series.series(auction_id, resolution))
+
+def _feed_json(cards):
+    return jsonify({'auctions': [dict(card, end_time=card['end_time'].isoformat()) for card in cards]})
+
+@bp.route('/api/feeds/ending-soon')
+def feed_ending_soon():
+    """Active auctions ending soonest; ``?limit=`` up to FEED_SIZE."""
+    limit = max(1, min(request.args.get('limit', feeds.FEED_SIZE, type=int), feeds.FEED_SIZE))
+    return _feed_json(feeds.ending_soon(limit))
+
+@bp.route('/api/feeds/hot')
+def feed_hot():
+    """Active auctions with the most bidding lately, each with its ``heat``; ``?limit=`` up to FEED_SIZE."""
+    limit = max(1, min(request.args.get('limit', feeds.FEED_SIZE, type=int), feeds.FEED_SIZE))
+    return _feed_json(feeds.hot(limit))
+
+@bp.route("/create_auction", methods=["GET", "POST"])
+def create_auction():
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+
+    if request.method == "POST":
+        try:
+            # ✅ Get form fields
+            title = request.form.get("title")
+            description = request.form.get("description")
+            starting_price = request.form.get("starting_price")
+            end_time = request.form.get("end_time")
+            category = request.form.get("category")
+            history_link = request.form.get("history_link") or None
+
+            # ✅ Validation
+            if not title or not description or not starting_price or not end_time or not category:
+                flash("All required fields must be filled.", "danger")
+                return render_template("create-auction.html")
+
+            try:
+                starting_price = float(starting_price)
+            except ValueError:
+                flash("Starting price must be a number.", "danger")
+                return render_template("create-auction.html")
+
+            try:
+                end_time = datetime.strptime(end_time, "%Y-%m-%dT%H:%M")
+            except ValueError:
+                flash("Invalid end time format.", "danger")
+                return render_template("create-auction.html")
+
+            # ✅ Handle file upload
+            file_url = None
+            if "image_file" in request.files:
+                file = request.files["image_file"]
+                if file and allowed_file(file.filename):
+                    filename = secure_filename(file.filename)
+                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+                    filepath = os.path.join(UPLOAD_FOLDER, filename)
+                    file.save(filepath)
+                    file_url = f"/uploads/{filename}"  # you can serve it with a static route
+
+            # ✅ Create Auction object
+            new_auction = Auction(
+                title=title,
+                description=description,
+                starting_price=starting_price,
+                current_price=starting_price,
+                seller_id=session['user_id'],
+                end_time=end_time,
+                category=category,
+                history_link=history_link,
+                image_url=file_url,
+                created_at=datetime.utcnow()
+            )
+
+            db.session.add(new_auction)
+            stats.bump('auctions')
+            db.session.commit()
+            feeds.track(new_auction.id)
+
+            flash("Auction created successfully!", "success")
+            return redirect(url_for("auctions.index"))
+
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error creating auction: {str(e)}", "danger")
+            return render_template("create-auction.html")
+
+    # ✅ If GET → show form
+    return render_template("create-auction.html")
+
+@bp.route('/uploads/<filename>')
+def uploaded_file(filename):
+    return send_from_directory(UPLOAD_FOLDER, filename)
+
+@bp.route('/edit_auction/<int:auction_id>', methods=['GET', 'POST'])
+def edit_auction(auction_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+
+    auction = queries.AUCTION_WITH_BID_COUNT.first(auction_id=auction_id)
+
+    if not auction:
+        return "Auction not found", 404
+
+    if auction.seller_id != session['user_id']:
+        return "You are not authorized to edit this auction.", 403
+
+    # Prevent editing if bids have been placed
+    if auction.bid_count > 0:
+        # In a real app, use flash messaging to inform the user why they were redirected.
+        return redirect(url_for('account.dashboard'))
+
+    if request.method == 'POST':
+        try:
+            title = request.form.get('title')
+            description = request.form.get('description')
+            end_time = request.form.get('end_time')
+            category = request.form.get('category')
+            history_link = request.form.get('history_link')
+            file = request.files.get('image_file')
+
+            if file and len(file.read()) > 5 * 1024 * 1024:
+                return render_template('edit-auction.html', auction=auction, error='File is too large. The limit is 5MB.')
+            file.seek(0)
+
+            if not all([title, description, end_time, category]):
+                return render_template('edit-auction.html', auction=auction, error='All fields except image are required.')
+
+            image_url = auction.image_url
+            if file and file.filename:
+                allowed_exts = {'jpg', 'jpeg', 'png', 'gif', 'pdf', 'webp', 'bmp', 'tiff', 'svg'}
+                ext = file.filename.rsplit('.', 1)[-1].lower()
+                if ext in allowed_exts:
+                    upload_folder = os.path.join(current_app.root_path, 'static', 'uploads')
+                    os.makedirs(upload_folder, exist_ok=True)
+                    filename = secure_filename(f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}")
+                    file_path = os.path.join(upload_folder, filename)
+                    file.save(file_path)
+                    image_url = os.path.join('uploads', filename).replace('\\', '/')
+
+            queries.UPDATE_AUCTION.execute(title=title, desc=description, end_time=end_time, cat=category,
+                                           hist=history_link, img=image_url, id=auction_id)
+            db.session.commit()
+            feeds.track(auction_id)
+            return redirect(url_for('account.dashboard'))
+        except Exception as e:
+            db.session.rollback()
+            log.exception("Error editing auction")
+            return render_template('edit-auction.html', auction=auction, error='An error occurred while saving.')
+
+    # For GET request
+    return render_template('edit-auction.html', auction=auction)
+
+@bp.route('/api/bid', methods=['POST'])
+@ratelimit.limit_bids
+def place_bid():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'})
+
+    try:
+        # Check if user is verified
+        user = current_user()
+        if not user or not user['email_verified']:
+            return jsonify({'success': False, 'message': 'You must verify your email before bidding.'})
+
+        data = request.get_json()
+        auction_id = int(data.get('auction_id'))
+        bid_amount = float(data.get('amount'))
+
+        leading, price = bidding.place_bid(auction_id, session['user_id'], bid_amount)
+        if not leading:
+            return jsonify({'success': True, 'leading': False, 'current_price': float(price),
+                            'message': "Bid placed, but another bidder's maximum bid is higher."})
+        return jsonify({'success': True, 'leading': True, 'current_price': float(price),
+                        'message': 'Bid placed successfully'})
+
+    except bidding.BidRejected as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        log.exception("Error in place_bid route")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'An error occurred while placing the bid.'})
+
+@bp.route('/api/proxy_bid', methods=['POST'])
+@ratelimit.limit_bids
+def place_proxy_bid():
+    """Set the maximum the server may bid on the user's behalf (see bidding.py)."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'})
+
+    try:
+        user = current_user()
+        if not user or not user['email_verified']:
+            return jsonify({'success': False, 'message': 'You must verify your email before bidding.'})
+
+        data = request.get_json()
+        auction_id = int(data.get('auction_id'))
+        max_amount = float(data.get('max_amount'))
+
+        leading, price = bidding.set_max_bid(auction_id, session['user_id'], max_amount)
+        if not leading:
+            return jsonify({'success': True, 'leading': False, 'current_price': float(price),
+                            'message': "Maximum saved, but another bidder's maximum is higher."})
+        return jsonify({'success': True, 'leading': True, 'current_price': float(price),
+                        'message': f'Maximum saved. You are the highest bidder at ₹{price:.2f}.'})
+
+    except bidding.BidRejected as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        log.exception("Error in place_proxy_bid route")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'An error occurred while saving your maximum bid.'})
+
+@bp.route('/order/<int:auction_id>', methods=['GET', 'POST'])
+def order(auction_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auctions.index'))
+
+    try:
+        # Get auction details
+        auction = queries.AUCTION_FOR_ORDER.first(auction_id=auction_id)
+        if not auction:
+            return "Auction not found", 404
+
+        # Check if auction ended
+        end_time = auction.end_time
+        if not end_time or end_time > datetime.now():
+            return "Auction not ended yet", 403
+
+        # Get highest bid (winner)
+        winner = queries.WINNING_BID.first(auction_id=auction_id)
+        if not winner or winner.user_id != session['user_id']:
+            return "You are not the winner of this auction.", 403
+
+        # Check if order already exists
+        if queries.USER_ORDER_FOR_AUCTION.first(auction_id=auction_id, user_id=session['user_id']):
+            return "Order already placed for this auction.", 400
+
+        if request.method == 'POST':
+            address = request.form.get('address')
+            payment = request.form.get('payment')
+            if address and payment:
+                queries.INSERT_ORDER.execute(auction_id=auction_id, user_id=session['user_id'], address=address,
+                                             payment_status='paid', order_status='Ordered', created_at=datetime.now())
+                stats.bump('orders')
+                stats.bump('orders_status:Ordered')
+                stats.bump('gmv', auction.current_price)
+                db.session.commit()
+                delivery_date = get_delivery_date(datetime.now())
+                return render_template('order-success.html', delivery_date=delivery_date)
+            else:
+                return render_template('order.html', error='All fields are required.')
+
+        return render_template('order.html')
+    except Exception as e:
+        log.exception("Error in /order route")
+        return render_template('error.html', message="A database error occurred."), 500
+
+
+    # ...existing code...
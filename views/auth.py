@@ -0,0 +1,85 @@
+"""Registration, login and logout."""
+import logging
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, session, redirect, url_for
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db
+import passwords
+import queries
+import stats
+
+bp = Blueprint('auth', __name__)
+log = logging.getLogger(__name__)
+
+
+@bp.errorhandler(passwords.Busy)
+def login_busy(e):
+    response = jsonify({'success': False, 'message': 'Too many sign-ins right now, please try again in a moment.'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+
+@bp.route('/api/register', methods=['POST'])
+def register():
+    data = request.get_json()
+    name = data.get('name')
+    email = data.get('email')
+    password = data.get('password')
+
+    if not all([name, email, password]):
+        return jsonify({'success': False, 'message': 'All fields required'})
+
+    try:
+        # Check if user already exists
+        if queries.USER_ID_BY_EMAIL.first(email=email):
+            return jsonify({'success': False, 'message': 'Email already registered'})
+
+        # Hash password (off the event loop, see passwords.py)
+        with passwords.admitted():
+            hashed_password = passwords.hash_password(password)
+
+        # Insert user with email_verified = False
+        queries.INSERT_USER.execute(
+            name=name,
+            email=email,
+            password=hashed_password,
+            created_at=datetime.now(),
+            email_verified=False   # 👈 boolean, not integer
+        )
+        stats.bump('users')
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Registration successful'})
+
+    except SQLAlchemyError as e:
+        db.session.rollback()   # 👈 rollback fix
+        log.exception("Error in register route")
+        return jsonify({'success': False, 'message': 'Database error during registration.'})
+
+    finally:
+        db.session.close()  # 👈 cleanup session (good practice)
+
+@bp.route('/api/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+
+    with passwords.admitted():
+        user = queries.USER_LOGIN.first(email=email)
+
+        # SQLAlchemy automatically handles connection closing
+        valid = user is not None and passwords.check_password(user.password, password)
+
+    if valid:
+        session['user_id'] = user.id
+        session['user_name'] = user.name
+        return jsonify({'success': True, 'message': 'Login successful'})
+
+    return jsonify({'success': False, 'message': 'Invalid credentials'})
+
+@bp.route('/api/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('auctions.index'))
@@ -0,0 +1,27 @@
+"""Socket.IO event handlers."""
+from flask import session
+from flask_socketio import join_room
+
+import realtime
+
+
+def register(socketio):
+    @socketio.on('connect')
+    def handle_connect():
+        realtime.client_connected()
+        if 'user_id' in session:
+            # Join a room for user-specific notifications
+            join_room(str(session['user_id']))
+
+    @socketio.on('disconnect')
+    def handle_disconnect(*args):
+        realtime.client_disconnected()
+
+    @socketio.on('join_auction')
+    def handle_join_auction(data):
+        """Client joins a room for a specific auction to receive real-time bid updates."""
+        auction_id = data.get('auction_id')
+        if auction_id:
+            room = f"auction_{auction_id}"
+            join_room(room)
+            realtime.room_joined()
@@ -0,0 +1,123 @@
+"""Warm a worker up before it takes traffic.
+
+After a deploy or restart, the page cache and every per-process structure
+(feeds, user cache, compiled templates, pooled connections) start cold. Left
+alone, the first wave of visitors would all go to the database at once.
+When the gunicorn worker loads the app (wsgi.py), ``start`` runs ``warm`` in
+a background task, so the worker starts answering (and heartbeating) at once.
+``warm`` rebuilds the feeds, then renders the pages that first wave will ask
+for through an in-process test client, with up to ``WARMUP_CONCURRENCY``
+requests at a time:
+
+* the home page and the listing for each category with active auctions;
+* the detail page and price chart of the ``WARMUP_TOP_AUCTIONS`` auctions
+  with the most recent bidding, topped up with those ending soonest.
+
+Warming is best effort and bounded by ``WARMUP_TIMEOUT_SECONDS``. A failed or
+slow page is logged and skipped, and it never keeps the worker down.
+``GET /readyz`` answers 503 from ``start`` until warming has finished and 200
+after, so a load balancer health check can hold traffic back until then. A
+process that never warms up (``WARMUP_ENABLED=0``, the dev server, scripts)
+is ready at once.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import jsonify
+
+import feeds
+import queries
+import realtime
+import replicas
+
+log = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1') == '1'
+WARMUP_CONCURRENCY = int(os.getenv('WARMUP_CONCURRENCY', 4))
+WARMUP_TOP_AUCTIONS = int(os.getenv('WARMUP_TOP_AUCTIONS', 20))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', 20))
+
+_lock = threading.Lock()
+_state = {'ready': True, 'pages': 0, 'failed': 0, 'skipped': 0, 'seconds': None}
+
+
+def _targets():
+    """Paths to prefetch, most valuable first."""
+    with replicas.reading():
+        categories = [row.category for row in queries.ACTIVE_AUCTIONS_BY_CATEGORY.all(now=datetime.now())]
+    auction_ids = [card['id'] for card in feeds.hot(WARMUP_TOP_AUCTIONS)]
+    for card in feeds.ending_soon(WARMUP_TOP_AUCTIONS):
+        if len(auction_ids) >= WARMUP_TOP_AUCTIONS:
+            break
+        if card['id'] not in auction_ids:
+            auction_ids.append(card['id'])
+
+    paths = ['/'] + ['/?' + urlencode({'category': category}) for category in categories]
+    for auction_id in auction_ids:
+        paths += [f'/auction/{auction_id}', f'/api/auction/{auction_id}/price-series']
+    return paths
+
+
+def _fetch(app, path, index):
+    start = time.perf_counter()
+    # Anonymous on purpose: the page cache only serves signed-out visitors.
+    response = app.test_client().get(path, headers={'X-Request-ID': f'warmup-{index}'})
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f'{path} answered {response.status_code}')
+    log.debug("Warmed page", extra={'path': path, 'ms': round(elapsed * 1000, 1)})
+
+
+def warm(app):
+    """Prefetch the hot pages into this process, then mark it ready. Returns the warm-up stats."""
+    started = time.perf_counter()
+    pages = failed = skipped = 0
+    try:
+        with app.app_context():
+            feeds.load()
+            paths = _targets()
+        pool = ThreadPoolExecutor(max_workers=WARMUP_CONCURRENCY)
+        futures = {pool.submit(_fetch, app, path, i): path for i, path in enumerate(paths)}
+        done, pending = wait(futures, timeout=WARMUP_TIMEOUT_SECONDS)
+        # Don't wait for pages still rendering at the deadline; they finish on their own.
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in done:
+            if future.exception() is None:
+                pages += 1
+            else:
+                failed += 1
+                log.warning("Warm-up page failed", extra={'path': futures[future], 'error': str(future.exception())})
+        skipped = len(pending)
+    except Exception:
+        log.exception("Warm-up failed; taking traffic cold")
+    seconds = round(time.perf_counter() - started, 2)
+    with _lock:
+        _state.update(ready=True, pages=pages, failed=failed, skipped=skipped, seconds=seconds)
+    log.info("Worker warmed up", extra={'pages': pages, 'failed': failed, 'skipped': skipped, 'seconds': seconds})
+    return snapshot()
+
+
+def start(app):
+    """Report not ready and warm up in a background task. Call once the app is built."""
+    with _lock:
+        _state['ready'] = False
+    return realtime.start_background_task(warm, app)
+
+
+def snapshot():
+    with _lock:
+        return dict(_state)
+
+
+def readyz():
+    state = snapshot()
+    return jsonify(state), 200 if state['ready'] else 503
+
+
+def init_app(app):
+    app.add_url_rule('/readyz', 'readyz', readyz)
@@ -1,2 +1,8 @@
-from app import app
-application = app
+from app import create_app
+import warmup
+
+application = create_app()
+
+# Gunicorn loads this module in the worker. Warming runs in the background; /readyz is 503 until it is done.
+if warmup.WARMUP_ENABLED:
+    warmup.start(application)